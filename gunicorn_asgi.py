@@ -0,0 +1,13 @@
+# gunicorn run profile for the ASGI entry point:
+#   gunicorn hostel_management.asgi -c gunicorn_asgi.py
+# Each uvicorn worker is one event loop serving the async views and the
+# /events/ streams; sync views still run, on the worker's thread pool.
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = 'uvicorn.workers.UvicornWorker'
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+# Server-Sent Events connections stay open; don't treat them as hung workers
+timeout = 0
+graceful_timeout = 20
+keepalive = 5
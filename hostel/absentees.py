@@ -0,0 +1,53 @@
+import datetime
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from . import stats
+from .models import AbsenteeFlag
+from .streaks import AttendanceMatrix
+
+RECENT_DAYS = 7
+BASELINE_DAYS = 28
+
+
+def detect(end=None, window=365, streak=3, drop=30.0):
+    """Score every student over ``window`` days ending at ``end`` and return unsaved AbsenteeFlags.
+
+    A student is flagged for an ongoing run of at least ``streak`` recorded
+    absences, or when their attendance over the last week fell at least
+    ``drop`` percentage points below the four weeks before it.
+    """
+    end = end or timezone.localdate()
+    start = end - datetime.timedelta(days=max(window, RECENT_DAYS + BASELINE_DAYS) - 1)
+    matrix = AttendanceMatrix.load(start, end)
+
+    streaks = matrix.current_absence_streaks()
+    recent = matrix.rates(slice(-RECENT_DAYS, None))
+    baseline = matrix.rates(slice(-(RECENT_DAYS + BASELINE_DAYS), -RECENT_DAYS))
+    # NaN (no roll call in either window) compares False and is never flagged
+    with np.errstate(invalid='ignore'):
+        flagged = (streaks >= streak) | (baseline - recent >= drop)
+
+    return [
+        AbsenteeFlag(
+            student_id=int(matrix.student_ids[i]),
+            detected_on=end,
+            absence_streak=int(streaks[i]),
+            recent_rate=None if np.isnan(recent[i]) else float(recent[i]),
+            baseline_rate=None if np.isnan(baseline[i]) else float(baseline[i]),
+        )
+        for i in np.nonzero(flagged)[0]
+    ]
+
+
+def run(dry_run=False, **options):
+    """Replace the stored flags with a fresh detect() run; returns the new flags"""
+    flags = detect(**options)
+    if not dry_run:
+        with transaction.atomic():
+            AbsenteeFlag.objects.all().delete()
+            AbsenteeFlag.objects.bulk_create(flags, batch_size=1000)
+        stats.invalidate('absentees')
+    return flags
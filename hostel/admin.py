@@ -1,17 +1,28 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from . import search
+from .allocation import allocate_rooms
 from .models import Student, Room, Announcement, Attendance
+from .services import delete_attendance
 
 @admin.register(Student)
 class StudentAdmin(admin.ModelAdmin):
     list_display = ('roll_number', 'user', 'gender', 'phone_number', 'room')
     search_fields = ('roll_number', 'user__username', 'user__first_name', 'user__last_name')
     list_filter = ('gender', 'room')
+    actions = ['auto_allocate_rooms']
+    
+    @admin.action(description='Auto-allocate rooms to selected unassigned students')
+    def auto_allocate_rooms(self, request, queryset):
+        plan = allocate_rooms(student_ids=list(queryset.values_list('pk', flat=True)))
+        self.message_user(request, f'Allocated {len(plan.assignments)} students.', messages.SUCCESS)
+        if plan.unplaced:
+            self.message_user(request, f'{len(plan.unplaced)} students could not be placed.', messages.WARNING)
 
 @admin.register(Room)
 class RoomAdmin(admin.ModelAdmin):
-    list_display = ('room_number', 'room_type', 'capacity', 'is_available')
+    list_display = ('room_number', 'block', 'room_type', 'capacity', 'occupant_count', 'is_available')
     search_fields = ('room_number',)
-    list_filter = ('room_type', 'is_available')
+    list_filter = ('block', 'room_type', 'is_available')
 
 @admin.register(Announcement)
 class AnnouncementAdmin(admin.ModelAdmin):
@@ -19,8 +30,20 @@ class AnnouncementAdmin(admin.ModelAdmin):
     search_fields = ('title', 'content')
     list_filter = ('date_posted',)
 
+    def get_search_results(self, request, queryset, search_term):
+        # Match through the full-text index instead of ILIKE scans over the content
+        if not search_term:
+            return queryset, False
+        return search.filter_announcements(queryset, search_term), False
+
 @admin.register(Attendance)
 class AttendanceAdmin(admin.ModelAdmin):
     list_display = ('student', 'date', 'is_present')
     search_fields = ('student__roll_number', 'student__user__username')
     list_filter = ('date', 'is_present')
+
+    def delete_model(self, request, obj):
+        delete_attendance(Attendance.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        delete_attendance(queryset)
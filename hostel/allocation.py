@@ -0,0 +1,110 @@
+from collections import deque
+
+from django.db import transaction
+
+from . import stats
+from .models import Student, Room
+from .services import update_room_occupancy
+
+# Larger rooms are opened first so fewer rooms end up partly filled
+OPEN_ORDER = ('T', 'D', 'S')
+
+
+class AllocationPlan:
+    """Result of a batch allocation: ``assignments`` maps student id to room id"""
+    def __init__(self, assignments, unplaced):
+        self.assignments = assignments
+        self.unplaced = unplaced
+
+
+def plan_allocation(students, rooms):
+    """Compute a room for every student in memory.
+
+    ``students`` is an iterable of ``(id, gender, room_preference)`` tuples,
+    handled in order; ``rooms`` holds ``(id, room_type, free_beds, gender)``
+    tuples where gender is that of the current occupants, or None for an
+    empty room. Partly filled rooms of the student's gender are filled
+    before new rooms are opened, a room is never shared across genders, and
+    a student's preferred room type wins while it has beds left.
+    """
+    open_rooms = {}  # (gender, room_type) -> deque of [room_id, free_beds]
+    empty_rooms = {room_type: deque() for room_type in OPEN_ORDER}
+    for room_id, room_type, free, gender in sorted(rooms, key=lambda room: room[2]):
+        if free <= 0:
+            continue
+        if gender is None:
+            empty_rooms[room_type].append((room_id, free))
+        else:
+            # Sorted by free beds, so the fullest rooms are topped up first
+            open_rooms.setdefault((gender, room_type), deque()).append([room_id, free])
+
+    def take_open(gender, room_type):
+        beds = open_rooms.get((gender, room_type))
+        if not beds:
+            return None
+        room = beds[0]
+        room[1] -= 1
+        if not room[1]:
+            beds.popleft()
+        return room[0]
+
+    def take_empty(gender, room_type):
+        if not empty_rooms[room_type]:
+            return None
+        room_id, free = empty_rooms[room_type].popleft()
+        if free > 1:
+            open_rooms.setdefault((gender, room_type), deque()).appendleft([room_id, free - 1])
+        return room_id
+
+    assignments, unplaced = {}, []
+    for student_id, gender, preference in students:
+        room_id = None
+        if preference:
+            room_id = take_open(gender, preference) or take_empty(gender, preference)
+        for room_type in OPEN_ORDER:
+            room_id = room_id or take_open(gender, room_type)
+        for room_type in OPEN_ORDER:
+            room_id = room_id or take_empty(gender, room_type)
+        if room_id:
+            assignments[student_id] = room_id
+        else:
+            unplaced.append(student_id)
+    return AllocationPlan(assignments, unplaced)
+
+
+def allocate_rooms(student_ids=None, dry_run=False):
+    """Allocate every unassigned student (or just ``student_ids``) to a free bed.
+
+    Reads students and free capacity with a handful of queries, solves in
+    memory with plan_allocation() and writes the result back with one bulk
+    update. With ``dry_run`` nothing is written.
+    """
+    with transaction.atomic():
+        students = Student.objects.select_for_update().filter(room__isnull=True).order_by('roll_number')
+        if student_ids is not None:
+            students = students.filter(pk__in=student_ids)
+        students = list(students.values_list('pk', 'gender', 'room_preference'))
+
+        free_rooms = list(
+            Room.objects.select_for_update().filter(is_available=True).order_by('pk')
+            .values_list('pk', 'room_type', 'capacity', 'occupant_count')
+        )
+        occupant_gender = dict(
+            Student.objects.filter(room__is_available=True).values_list('room_id', 'gender').distinct()
+        )
+        plan = plan_allocation(students, [
+            (room_id, room_type, capacity - occupants, occupant_gender.get(room_id))
+            for room_id, room_type, capacity, occupants in free_rooms
+        ])
+
+        if not dry_run and plan.assignments:
+            Student.objects.bulk_update(
+                [Student(pk=student_id, room_id=room_id) for student_id, room_id in plan.assignments.items()],
+                ['room'],
+                batch_size=1000,
+            )
+            # bulk_update bypasses the model signals
+            update_room_occupancy(set(plan.assignments.values()))
+            stats.bump_roster_version()
+            stats.bump_generation(Student)
+    return plan
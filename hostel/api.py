@@ -0,0 +1,269 @@
+import datetime
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.http import HttpResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from . import stats, sync, typeahead
+from .models import Student, Room, IdempotencyKey
+from .services import mark_attendance_bulk
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ROOM_FIELDS = ('id', 'room_number', 'block', 'room_type', 'capacity', 'occupant_count', 'is_available')
+STUDENT_FIELDS = {
+    'first_name': F('user__first_name'),
+    'last_name': F('user__last_name'),
+    'room_number': F('room__room_number'),
+}
+STUDENT_PAGE_SIZE = 500
+MAX_STUDENT_PAGE_SIZE = 2000
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+
+def loads(body):
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def json_response(data, status=200):
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
+
+
+def api_view(view):
+    """Authenticate a JSON API view by bearer token or staff session.
+
+    Token requests skip CSRF; session requests still need a CSRF token for
+    writes, exactly like the HTML views.
+    """
+    @csrf_exempt
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        header = request.headers.get('Authorization', '')
+        if header.startswith('Bearer '):
+            token = header[len('Bearer '):]
+            if not any(constant_time_compare(token, known) for known in getattr(settings, 'HOSTEL_API_TOKENS', [])):
+                return json_response({'error': 'Invalid API token.'}, status=401)
+        elif request.user.is_authenticated and request.user.is_staff:
+            if CsrfViewMiddleware(lambda request: None).process_view(request, None, (), {}):
+                return json_response({'error': 'CSRF verification failed.'}, status=403)
+        else:
+            return json_response({'error': 'Authentication required.'}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def idempotent(view):
+    """Replay the stored response when a write is retried with the same Idempotency-Key.
+
+    The view runs in a transaction together with storing its response, so a
+    retry racing the original request either sees the stored response or
+    loses on the unique key and replays it. Reusing a key for a different
+    request body is rejected. Views must defer cache and event side effects
+    with transaction.on_commit(), so they only happen once the key is stored.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > 255:
+            return json_response({'error': 'Idempotency-Key is too long.'}, status=400)
+
+        request_hash = hashlib.sha256(request.path.encode() + b'\n' + request.body).hexdigest()
+        ttl = datetime.timedelta(hours=getattr(settings, 'HOSTEL_API_IDEMPOTENCY_TTL', 24))
+        IdempotencyKey.objects.filter(created_at__lt=timezone.now() - ttl).delete()
+
+        stored = IdempotencyKey.objects.filter(key=key).first()
+        if stored is None:
+            try:
+                # on_commit() callbacks registered by the view run after the key commits
+                with transaction.atomic():
+                    response = view(request, *args, **kwargs)
+                    if response.status_code < 500:
+                        IdempotencyKey.objects.create(
+                            key=key,
+                            request_hash=request_hash,
+                            status_code=response.status_code,
+                            response=response.content,
+                        )
+                return response
+            except IntegrityError:
+                stored = IdempotencyKey.objects.filter(key=key).first()
+                if stored is None:
+                    raise
+
+        if stored.request_hash != request_hash:
+            return json_response({'error': 'Idempotency-Key was already used for a different request.'}, status=422)
+        response = HttpResponse(bytes(stored.response), status=stored.status_code, content_type='application/json')
+        response['Idempotent-Replayed'] = 'true'
+        return response
+    return wrapper
+
+
+@api_view
+@require_GET
+def rooms(request):
+    """List rooms with live occupancy; ``?available=1`` and ``?block=`` filter the list"""
+    rooms = Room.objects.order_by('room_number')
+    if request.GET.get('available') in ('1', 'true'):
+        rooms = rooms.filter(is_available=True)
+    if request.GET.get('block'):
+        rooms = rooms.filter(block=request.GET['block'])
+    return json_response({'results': list(rooms.values(*ROOM_FIELDS))})
+
+
+@api_view
+@require_GET
+def students(request):
+    """Page through the student roster by id; pass the returned ``next`` as ``?after=``"""
+    try:
+        after = int(request.GET.get('after', 0))
+        limit = min(max(int(request.GET.get('limit', STUDENT_PAGE_SIZE)), 1), MAX_STUDENT_PAGE_SIZE)
+    except ValueError:
+        return json_response({'error': 'after and limit must be integers.'}, status=400)
+
+    rows = list(
+        Student.objects.filter(pk__gt=after).order_by('pk')
+        .values('id', 'roll_number', 'gender', 'room_id', **STUDENT_FIELDS)[:limit + 1]
+    )
+    next_cursor = rows[limit - 1]['id'] if len(rows) > limit else None
+    return json_response({'results': rows[:limit], 'next': next_cursor})
+
+
+@api_view
+@require_GET
+def student_search(request):
+    """Typeahead lookup by roll number, name or phone prefix; ``?q=`` and optional ``?limit=``"""
+    try:
+        limit = min(max(int(request.GET.get('limit', typeahead.MAX_RESULTS)), 1), 50)
+    except ValueError:
+        return json_response({'error': 'limit must be an integer.'}, status=400)
+    return json_response({'results': typeahead.lookup(request.GET.get('q', ''), limit)})
+
+
+def _parse_records(records):
+    """Turn raw records into ``(index, roll_number, date, present, recorded_at)`` tuples and a list of errors"""
+    now = timezone.now()
+    parsed, errors = [], []
+    for index, record in enumerate(records):
+        try:
+            roll_number, date, present = record['roll_number'], record['date'], record['present']
+            if not isinstance(roll_number, str) or not isinstance(present, bool):
+                raise TypeError
+            recorded_at = record.get('recorded_at')
+            if recorded_at is not None:
+                recorded_at = sync.parse_recorded_at(recorded_at, now)
+            parsed.append((index, roll_number, datetime.date.fromisoformat(date), present, recorded_at))
+        except (KeyError, TypeError, ValueError):
+            errors.append({
+                'index': index,
+                'error': 'Expected a roll_number, an ISO date, a boolean present and an optional ISO recorded_at.',
+            })
+    return parsed, errors
+
+
+@api_view
+@require_POST
+@idempotent
+def attendance(request):
+    """Upsert a batch of ``{"roll_number", "date", "present"}`` attendance records.
+
+    The batch is validated as a whole; if any record is invalid nothing is
+    written. ``recorded_at`` says when a mark was taken (default now), which
+    offline sync compares against. Records are grouped by date and each day is written with
+    mark_attendance_bulk(), so the number of statements depends on the
+    number of distinct dates rather than records.
+    """
+    try:
+        payload = loads(request.body)
+    except ValueError:
+        return json_response({'error': 'Request body is not valid JSON.'}, status=400)
+    records = payload.get('records') if isinstance(payload, dict) else payload
+    if not isinstance(records, list):
+        return json_response({'error': 'Expected a list of records.'}, status=400)
+    max_records = getattr(settings, 'HOSTEL_API_MAX_RECORDS', 10000)
+    if len(records) > max_records:
+        return json_response({'error': f'At most {max_records} records per request.'}, status=400)
+
+    parsed, errors = _parse_records(records)
+    students = dict(
+        Student.objects.filter(roll_number__in={row[1] for row in parsed}).values_list('roll_number', 'id')
+    )
+    by_date = {}
+    for index, roll_number, date, present, recorded_at in parsed:
+        if roll_number not in students:
+            errors.append({'index': index, 'error': f'Unknown roll number {roll_number}.'})
+            continue
+        presence, timestamps = by_date.setdefault(date, ({}, {}))
+        presence[students[roll_number]] = present
+        if recorded_at is not None:
+            timestamps[students[roll_number]] = recorded_at
+    if errors:
+        return json_response({'errors': sorted(errors, key=lambda error: error['index'])}, status=400)
+
+    created = updated = 0
+    with transaction.atomic():
+        for date, (presence, timestamps) in sorted(by_date.items()):
+            day_created, day_updated = mark_attendance_bulk(date, presence, recorded_at=timestamps)
+            created += day_created
+            updated += day_updated
+    return json_response({'created': created, 'updated': updated, 'dates': len(by_date)})
+
+
+@api_view
+@require_GET
+def sync_roster(request):
+    """Roster snapshot for offline roll call; ``?version=`` answers ``unchanged`` if it is current"""
+    version = request.GET.get('version')
+    if version and version == stats.roster_version():
+        return json_response({'version': version, 'unchanged': True})
+    return json_response(sync.roster_snapshot())
+
+
+@api_view
+@require_POST
+@idempotent
+def sync_attendance(request):
+    """Merge marks taken offline, uploaded as ``{"changes": [[student_id, date, present, recorded_at], ...]}``.
+
+    The response lists the marks the server kept instead (``conflicts``),
+    students that no longer exist, and the current roster ``version`` so
+    the client knows whether to download the roster again.
+    """
+    try:
+        payload = loads(request.body)
+    except ValueError:
+        return json_response({'error': 'Request body is not valid JSON.'}, status=400)
+    changes = payload.get('changes') if isinstance(payload, dict) else None
+    if not isinstance(changes, list):
+        return json_response({'error': 'Expected a list of changes.'}, status=400)
+    max_records = getattr(settings, 'HOSTEL_API_MAX_RECORDS', 10000)
+    if len(changes) > max_records:
+        return json_response({'error': f'At most {max_records} changes per request.'}, status=400)
+
+    try:
+        result = sync.merge_changes(changes)
+    except sync.SyncError as error:
+        return json_response({'error': str(error)}, status=400)
+    result['version'] = stats.roster_version()
+    return json_response(result)
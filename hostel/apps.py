@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class HostelConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'hostel'
+
+    def ready(self):
+        from . import signals  # noqa: F401
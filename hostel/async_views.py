@@ -0,0 +1,117 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import render, redirect, aget_object_or_404
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import Student, Room, Announcement, Attendance, StudentMonthlyAttendance
+from . import routers, search, stats
+
+# Async versions of the read-heavy pages, routed instead of the ones in
+# views.py when HOSTEL_ASYNC_VIEWS is on. Templates are rendered in the event
+# loop, so everything they touch must already be loaded: querysets are
+# materialised with async iteration and relations are select_related.
+
+
+async def _user(request):
+    """The logged-in user, pinned on the request so templates don't load it synchronously"""
+    user = await request.auser()
+    request.user = user
+    return user
+
+
+async def _list(queryset):
+    return [obj async for obj in queryset]
+
+
+@login_required
+async def dashboard(request):
+    """User dashboard view"""
+    user = await _user(request)
+    if user.is_staff:
+        return render(request, 'hostel/admin_dashboard.html', {
+            **await stats.aget_stats(), 'fragment_timeout': stats.TIMEOUT,
+        })
+
+    student = await request.astudent()
+    if student is None:
+        messages.warning(request, 'Please complete your student profile.')
+        return redirect('profile')
+
+    attendance, month_attendance, announcements = await asyncio.gather(
+        _list(Attendance.objects.filter(student=student).order_by('-date')[:5]),
+        StudentMonthlyAttendance.objects.filter(student=student, month=timezone.localdate().replace(day=1)).afirst(),
+        stats.aget_stats('announcements', 'announcement_etag'),
+    )
+    return render(request, 'hostel/dashboard.html', {
+        'student': student,
+        'room': student.room,
+        'attendance': attendance,
+        'month_attendance': month_attendance,
+        'announcements': announcements['announcements'],
+        'announcement_etag': announcements['announcement_etag'],
+        'fragment_timeout': stats.TIMEOUT,
+    })
+
+
+@login_required
+async def room_list(request):
+    """View all rooms"""
+    # The rows are loaded even when the template fragment is warm, since a lazy
+    # queryset can't be evaluated from the event loop
+    rooms, _, version = await asyncio.gather(
+        _list(routers.from_primary(Room.objects.all())), _user(request), sync_to_async(stats.generation)(Room),
+    )
+    return render(request, 'hostel/room_list.html', {
+        'rooms': rooms, 'rooms_version': version, 'fragment_timeout': stats.TIMEOUT,
+    })
+
+
+@login_required
+async def room_detail(request, room_id):
+    """View room details"""
+    room, _ = await asyncio.gather(aget_object_or_404(Room, id=room_id), _user(request))
+    students = await _list(Student.objects.filter(room=room).select_related('user'))
+    return render(request, 'hostel/room_detail.html', {
+        'room': room,
+        'students': students,
+    })
+
+
+@login_required
+async def announcement_list(request):
+    """View all announcements, or ranked search results for ``?q=``"""
+    # @condition calls its etag function synchronously, so the same checks are done by hand
+    user, stamp = await asyncio.gather(
+        _user(request), stats.aget_stats('announcement_etag', 'announcement_modified'),
+    )
+    etag = quote_etag(f"{user.pk}-{stamp['announcement_etag']}")
+    modified = stamp['announcement_modified']
+    last_modified = int(modified.timestamp()) if modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        query = request.GET.get('q', '').strip()
+        if query:
+            announcements = []
+            results = await sync_to_async(search.search_page)(query, request.GET.get('page'))
+        else:
+            # Unlike the sync view the rows are loaded even when the template fragment is warm,
+            # since a lazy queryset can't be evaluated from the event loop
+            announcements = await _list(routers.from_primary(Announcement.objects.select_related('posted_by')))
+            results = None
+        response = render(request, 'hostel/announcement_list.html', {
+            'announcements': announcements,
+            'announcement_etag': stamp['announcement_etag'],
+            'fragment_timeout': stats.TIMEOUT,
+            'query': query,
+            'results': results,
+        })
+    if request.method in ('GET', 'HEAD'):
+        response.headers.setdefault('ETag', etag)
+        if last_modified:
+            response.headers.setdefault('Last-Modified', http_date(last_modified))
+    return response
@@ -0,0 +1,113 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .models import Attendance, AttendanceBitmap
+
+BATCH_SIZE = 2000
+
+
+def enabled():
+    """Whether attendance writes also keep AttendanceBitmap up to date (HOSTEL_ATTENDANCE_BITMAPS)"""
+    return settings.HOSTEL_ATTENDANCE_BITMAPS
+
+
+def day_bit(date):
+    return 1 << (date.day - 1)
+
+
+def record(date, presence):
+    """Set ``date``'s bit for every student in ``presence`` (student id -> bool).
+
+    Creates missing month rows and then flips the bit with one UPDATE per
+    present/absent value, so the cost does not grow with the size of the
+    roll call.
+    """
+    if not presence:
+        return
+    month, bit = date.replace(day=1), day_bit(date)
+    with transaction.atomic():
+        AttendanceBitmap.objects.bulk_create(
+            [AttendanceBitmap(student_id=student_id, month=month) for student_id in presence],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        for is_present in (True, False):
+            ids = [student_id for student_id, value in presence.items() if bool(value) == is_present]
+            if not ids:
+                continue
+            present_mask = F('present_mask').bitor(bit) if is_present else F('present_mask').bitand(~bit)
+            AttendanceBitmap.objects.filter(month=month, student_id__in=ids).update(
+                present_mask=present_mask,
+                recorded_mask=F('recorded_mask').bitor(bit),
+            )
+
+
+def forget(date, student_ids):
+    """Clear ``date``'s bit for the given students, as if attendance was never taken"""
+    bit = day_bit(date)
+    AttendanceBitmap.objects.filter(month=date.replace(day=1), student_id__in=student_ids).update(
+        present_mask=F('present_mask').bitand(~bit),
+        recorded_mask=F('recorded_mask').bitand(~bit),
+    )
+
+
+def is_present(student_id, date):
+    """Return True/False for a student's attendance on ``date``, or None if it was not taken"""
+    bitmap = AttendanceBitmap.objects.filter(student_id=student_id, month=date.replace(day=1)).first()
+    return bitmap.is_present(date) if bitmap else None
+
+
+def pack(rows):
+    """Fold ``(student_id, date, is_present)`` rows into ``{(student_id, month): [present, recorded]}``"""
+    masks = {}
+    for student_id, date, present in rows:
+        bit = day_bit(date)
+        mask = masks.setdefault((student_id, date.replace(day=1)), [0, 0])
+        mask[1] |= bit
+        if present:
+            mask[0] |= bit
+    return masks
+
+
+def masks(start, end, student_ids=None):
+    """Return ``(student_id, month, present_mask, recorded_mask)`` rows for ``start``..``end``.
+
+    Reads AttendanceBitmap when it is kept up to date, otherwise packs the raw
+    Attendance rows in the range. Bitmap rows cover whole months, so days
+    outside the range may be set either way.
+    """
+    if enabled():
+        bitmaps = AttendanceBitmap.objects.filter(month__gte=start.replace(day=1), month__lte=end)
+        if student_ids is not None:
+            bitmaps = bitmaps.filter(student_id__in=student_ids)
+        return list(bitmaps.order_by().values_list('student_id', 'month', 'present_mask', 'recorded_mask'))
+
+    attendance = Attendance.objects.filter(date__gte=start, date__lte=end)
+    if student_ids is not None:
+        attendance = attendance.filter(student_id__in=student_ids)
+    packed = pack(
+        attendance.order_by().values_list('student_id', 'date', 'is_present').iterator(chunk_size=BATCH_SIZE)
+    )
+    return [(student_id, month, present, recorded) for (student_id, month), (present, recorded) in packed.items()]
+
+
+def rebuild(since=None):
+    """Rebuild the bitmaps from the raw Attendance table; returns the number of rows written"""
+    attendance = Attendance.objects.all()
+    bitmaps = AttendanceBitmap.objects.all()
+    if since:
+        since = since.replace(day=1)
+        attendance = attendance.filter(date__gte=since)
+        bitmaps = bitmaps.filter(month__gte=since)
+
+    masks = pack(
+        attendance.order_by().values_list('student_id', 'date', 'is_present').iterator(chunk_size=BATCH_SIZE)
+    )
+    with transaction.atomic():
+        bitmaps.delete()
+        AttendanceBitmap.objects.bulk_create([
+            AttendanceBitmap(student_id=student_id, month=month, present_mask=present, recorded_mask=recorded)
+            for (student_id, month), (present, recorded) in masks.items()
+        ], batch_size=BATCH_SIZE)
+    return len(masks)
@@ -0,0 +1,154 @@
+import datetime
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Student, Room, Announcement, Attendance
+from . import bitmaps, rollups, stats
+from .services import update_room_occupancy
+
+FIRST_NAMES = ['Ali', 'Sara', 'Omar', 'Ayesha', 'Hamza', 'Fatima', 'Bilal', 'Zainab', 'Usman', 'Maryam']
+LAST_NAMES = ['Khan', 'Ahmed', 'Malik', 'Hussain', 'Sheikh', 'Qureshi', 'Raza', 'Butt', 'Iqbal', 'Chaudhry']
+ROOM_CAPACITY = {'S': 1, 'D': 2, 'T': 3}
+BATCH_SIZE = 2000
+STAFF_USERNAME = 'gen_staff'
+
+
+class AlreadySeeded(Exception):
+    """Raised when rows with the keys generate() would use already exist"""
+
+
+def _created_ids(model, objs, key):
+    """Ids of bulk-created ``objs`` in order; fetched by their exact ``key`` where the database doesn't return them"""
+    if all(obj.pk for obj in objs):
+        return [obj.pk for obj in objs]
+    ids = dict(model.objects.filter(**{f'{key}__in': [getattr(obj, key) for obj in objs]}).values_list(key, 'pk'))
+    return [ids[getattr(obj, key)] for obj in objs]
+
+
+def _clear(room_numbers, usernames):
+    """Delete the rows a previous run created under the same keys"""
+    # Students, their attendance and the staff user's announcements go with the users
+    User.objects.filter(username__in=usernames + [STAFF_USERNAME]).delete()
+    Room.objects.filter(room_number__in=room_numbers).delete()
+
+
+def generate(rooms=200, students=500, announcements=50, days=365, seed=0, password='student123', stdout=None,
+             replace=False):
+    """Fill the database with synthetic hostel data using bulk inserts.
+
+    Generated rows get fixed keys: room numbers G00001..., usernames
+    gen000001... with roll numbers GEN-000001..., and the staff user
+    gen_staff. If any of this run's keys already exist, AlreadySeeded is
+    raised, unless ``replace`` is set, which first deletes exactly those
+    rows (and everything hanging off them). Returns a dict of row counts.
+    """
+    rng = random.Random(seed)
+    log = stdout.write if stdout else (lambda msg: None)
+    room_numbers = [f'G{i + 1:05d}' for i in range(rooms)]
+    usernames = [f'gen{i + 1:06d}' for i in range(students)]
+
+    with transaction.atomic():
+        if (Room.objects.filter(room_number__in=room_numbers).exists()
+                or User.objects.filter(username__in=usernames + [STAFF_USERNAME]).exists()):
+            if not replace:
+                raise AlreadySeeded('Generated rooms or users already exist.')
+            _clear(room_numbers, usernames)
+            log('Deleted the previously generated rows')
+
+        room_objs = []
+        for i, room_number in enumerate(room_numbers):
+            room_type = rng.choice('SDT')
+            room_objs.append(Room(
+                room_number=room_number,
+                block=f'Block {chr(ord("A") + i % 5)}',
+                room_type=room_type,
+                capacity=ROOM_CAPACITY[room_type],
+            ))
+        Room.objects.bulk_create(room_objs, batch_size=BATCH_SIZE)
+        for room, room_id in zip(room_objs, _created_ids(Room, room_objs, 'room_number')):
+            room.pk = room_id
+        log(f'Created {len(room_objs)} rooms')
+
+        # Hashing once and reusing the encoded value keeps generation fast.
+        encoded = make_password(password)
+        user_objs = [
+            User(
+                username=username,
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                email=f'{username}@hostel.example',
+                password=encoded,
+            )
+            for username in usernames
+        ]
+        User.objects.bulk_create(user_objs, batch_size=BATCH_SIZE)
+        user_ids = _created_ids(User, user_objs, 'username')
+
+        # Each gender draws beds from its own pool and takes a whole unclaimed
+        # room when that runs out, so no room ends up with mixed genders
+        unclaimed = iter(rng.sample(room_objs, len(room_objs)))
+        beds = {'M': [], 'F': []}
+        student_objs = []
+        for i, user_id in enumerate(user_ids):
+            gender = rng.choice('MF')
+            if not beds[gender]:
+                room = next(unclaimed, None)
+                beds[gender] = [room] * room.capacity if room else []
+            student_objs.append(Student(
+                user_id=user_id,
+                roll_number=f'GEN-{i + 1:06d}',
+                phone_number=f'03{rng.randrange(10 ** 9):09d}',
+                gender=gender,
+                room=beds[gender].pop() if beds[gender] else None,
+            ))
+        Student.objects.bulk_create(student_objs, batch_size=BATCH_SIZE)
+        student_ids = _created_ids(Student, student_objs, 'roll_number')
+        update_room_occupancy({student.room.id for student in student_objs if student.room})
+        log(f'Created {len(user_ids)} students')
+
+        staff = User.objects.create(
+            username=STAFF_USERNAME, is_staff=True, password=encoded, first_name='Hostel', last_name='Warden',
+        )
+        now = timezone.now()
+        Announcement.objects.bulk_create([
+            Announcement(
+                title=f'Notice #{i + 1}',
+                content=' '.join(rng.choice(FIRST_NAMES + LAST_NAMES) for _ in range(60)),
+                date_posted=now - datetime.timedelta(hours=rng.randrange(days * 24 or 1)),
+                posted_by=staff,
+            )
+            for i in range(announcements)
+        ], batch_size=BATCH_SIZE)
+        log(f'Created {announcements} announcements')
+
+        today = timezone.localdate()
+        batch = []
+        attendance = 0
+        for offset in range(days):
+            date = today - datetime.timedelta(days=offset)
+            for student_id in student_ids:
+                batch.append(Attendance(student_id=student_id, date=date, is_present=rng.random() < 0.9))
+                if len(batch) >= BATCH_SIZE:
+                    Attendance.objects.bulk_create(batch)
+                    attendance += len(batch)
+                    batch = []
+        Attendance.objects.bulk_create(batch)
+        attendance += len(batch)
+        log(f'Created {attendance} attendance records')
+        rollups.rebuild()
+        if bitmaps.enabled():
+            bitmaps.rebuild()
+
+    stats.invalidate()
+    stats.bump_roster_version()
+    stats.bump_generation(Room, User, Student)
+    return {
+        'rooms': len(room_objs),
+        'students': len(user_ids),
+        'announcements': announcements,
+        'attendance': attendance,
+    }
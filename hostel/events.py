@@ -0,0 +1,138 @@
+import asyncio
+import functools
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .models import Room
+
+# Sentinel telling a stream its subscriber was dropped for falling behind
+CLOSED = object()
+
+
+class Subscription:
+    """One stream's view of a broadcaster: missed events to replay, then live ones"""
+    def __init__(self, broadcaster, backlog, loop, queue):
+        self.broadcaster = broadcaster
+        self.backlog = backlog
+        self.loop = loop
+        self.queue = queue
+
+    async def get(self, timeout):
+        """Wait up to ``timeout`` seconds for the next ``(id, event, data)``; None on timeout"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broadcaster.unsubscribe(self)
+
+
+class InProcessBroadcaster:
+    """Fans events out to the SSE streams held open by this process.
+
+    ``publish`` may be called from any thread (signal handlers run in the
+    sync request threads); delivery hops onto each subscriber's event loop.
+    Events only reach streams in the same process, so with several ASGI
+    workers, or writes handled by WSGI workers, point
+    HOSTEL_EVENT_BROADCASTER at a backend that relays between processes.
+    Such a backend needs the same publish/subscribe/has_subscribers methods.
+    """
+    def __init__(self, history=200, queue_size=100):
+        self.history = deque(maxlen=history)
+        self.queue_size = queue_size
+        self.subscribers = {}  # event loop -> subscriptions served by it
+        self.last_id = 0
+        self.lock = threading.Lock()
+
+    def has_subscribers(self):
+        return bool(self.subscribers)
+
+    def publish(self, event, data):
+        with self.lock:
+            self.last_id += 1
+            message = (self.last_id, event, data)
+            self.history.append(message)
+            groups = [(loop, list(subscriptions)) for loop, subscriptions in self.subscribers.items()]
+        # One wake-up per event loop, however many streams it serves
+        for loop, subscriptions in groups:
+            try:
+                loop.call_soon_threadsafe(self._deliver, subscriptions, message)
+            except RuntimeError:
+                # The loop has shut down
+                with self.lock:
+                    self.subscribers.pop(loop, None)
+
+    def _deliver(self, subscriptions, message):
+        for subscription in subscriptions:
+            try:
+                subscription.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # A client this far behind reconnects and catches up from the history
+                self.unsubscribe(subscription)
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                subscription.queue.put_nowait(CLOSED)
+
+    def subscribe(self, last_event_id=None):
+        """Start receiving events; with ``last_event_id`` newer events still in the history are replayed"""
+        with self.lock:
+            backlog = [
+                message for message in self.history
+                if last_event_id is not None and message[0] > last_event_id
+            ]
+            loop = asyncio.get_running_loop()
+            subscription = Subscription(self, backlog, loop, asyncio.Queue(self.queue_size))
+            self.subscribers.setdefault(loop, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscribers.get(subscription.loop)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscribers[subscription.loop]
+
+
+@functools.cache
+def get_broadcaster():
+    return import_string(getattr(settings, 'HOSTEL_EVENT_BROADCASTER', 'hostel.events.InProcessBroadcaster'))()
+
+
+def announcement_posted(announcement):
+    """Push a new announcement to live clients once the transaction commits"""
+    def publish():
+        broadcaster = get_broadcaster()
+        if broadcaster.has_subscribers():
+            broadcaster.publish('announcement', {
+                'id': announcement.pk,
+                'title': announcement.title,
+                'content': announcement.content[:300],
+                'date_posted': announcement.date_posted.isoformat(),
+            })
+    transaction.on_commit(publish)
+
+
+def rooms_changed(room_ids):
+    """Push the occupancy of ``room_ids`` and the free room count once the transaction commits"""
+    room_ids = {room_id for room_id in room_ids if room_id is not None}
+    if not room_ids:
+        return
+
+    def publish():
+        broadcaster = get_broadcaster()
+        # Nobody listening means no queries on the assignment hot path
+        if broadcaster.has_subscribers():
+            broadcaster.publish('occupancy', {
+                'rooms': list(
+                    Room.objects.filter(pk__in=room_ids)
+                    .values('id', 'room_number', 'occupant_count', 'capacity', 'is_available')
+                ),
+                'available_rooms': Room.objects.filter(is_available=True).count(),
+            })
+    transaction.on_commit(publish)
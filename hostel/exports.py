@@ -0,0 +1,70 @@
+import csv
+import datetime
+import json
+
+from django.http import StreamingHttpResponse
+
+CHUNK_SIZE = 2000
+
+ATTENDANCE_COLUMNS = (
+    ('date', 'date'),
+    ('roll_number', 'student__roll_number'),
+    ('first_name', 'student__user__first_name'),
+    ('last_name', 'student__user__last_name'),
+    ('room', 'student__room__room_number'),
+    ('is_present', 'is_present'),
+)
+
+STUDENT_COLUMNS = (
+    ('roll_number', 'roll_number'),
+    ('username', 'user__username'),
+    ('first_name', 'user__first_name'),
+    ('last_name', 'user__last_name'),
+    ('email', 'user__email'),
+    ('phone_number', 'phone_number'),
+    ('gender', 'gender'),
+    ('room', 'room__room_number'),
+)
+
+
+class Echo:
+    """File-like object whose write() hands the value straight back, for csv.writer"""
+    def write(self, value):
+        return value
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def stream_rows(queryset, columns, fmt, filename):
+    """Stream a queryset as CSV or NDJSON without building model instances.
+
+    Rows come from ``values_list().iterator()`` so memory stays flat no
+    matter how many rows are exported.
+    """
+    headers = [name for name, _ in columns]
+    # The rows are read while the response streams, after the view and its
+    # database routing have finished, so the database is fixed here
+    queryset = queryset.using(queryset.db)
+    rows = queryset.values_list(*[field for _, field in columns]).iterator(chunk_size=CHUNK_SIZE)
+
+    if fmt == 'ndjson':
+        content = (json.dumps(dict(zip(headers, row)), default=_json_default) + '\n' for row in rows)
+        content_type, extension = 'application/x-ndjson', 'ndjson'
+    else:
+        writer = csv.writer(Echo())
+        content = _csv_lines(writer, headers, rows)
+        content_type, extension = 'text/csv', 'csv'
+
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+    return response
+
+
+def _csv_lines(writer, headers, rows):
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
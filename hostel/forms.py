@@ -1,7 +1,9 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
+from django.db import transaction
 from .models import Student, Room, Announcement, Attendance
+from .services import assign_room
 
 class UserRegistrationForm(UserCreationForm):
     first_name = forms.CharField(max_length=30, required=True)
@@ -15,7 +17,7 @@ class UserRegistrationForm(UserCreationForm):
 class StudentProfileForm(forms.ModelForm):
     class Meta:
         model = Student
-        fields = ['roll_number', 'phone_number', 'gender']
+        fields = ['roll_number', 'phone_number', 'gender', 'room_preference']
 
 class RoomAssignmentForm(forms.ModelForm):
     class Meta:
@@ -24,8 +26,10 @@ class RoomAssignmentForm(forms.ModelForm):
         
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Only show available rooms
-        self.fields['room'].queryset = Room.objects.filter(is_available=True)
+        # Only show available rooms without occupants of another gender
+        self.fields['room'].queryset = Room.objects.filter(is_available=True).exclude(
+            student__gender__in=[code for code, _ in Student.GENDER_CHOICES if code != self.instance.gender]
+        )
 
 class AnnouncementForm(forms.ModelForm):
     class Meta:
@@ -43,6 +47,31 @@ class AttendanceForm(forms.ModelForm):
 class BulkAttendanceForm(forms.Form):
     date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
 
+class AttendanceFilterForm(forms.Form):
+    STATUS_CHOICES = (
+        ('', 'All'),
+        ('present', 'Present'),
+        ('absent', 'Absent'),
+    )
+    
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    room = forms.ModelChoiceField(queryset=Room.objects.all(), required=False)
+    status = forms.ChoiceField(choices=STATUS_CHOICES, required=False)
+    
+    def filter(self, queryset):
+        """Apply the cleaned filters to an Attendance queryset"""
+        data = self.cleaned_data if self.is_valid() else {}
+        if data.get('date_from'):
+            queryset = queryset.filter(date__gte=data['date_from'])
+        if data.get('date_to'):
+            queryset = queryset.filter(date__lte=data['date_to'])
+        if data.get('room'):
+            queryset = queryset.filter(student__room=data['room'])
+        if data.get('status'):
+            queryset = queryset.filter(is_present=data['status'] == 'present')
+        return queryset
+
 class AdminCreateUserForm(forms.Form):
     first_name = forms.CharField(max_length=30, required=True)
     last_name = forms.CharField(max_length=30, required=True)
@@ -77,6 +106,7 @@ class AdminCreateUserForm(forms.Form):
         
         return cleaned_data
     
+    @transaction.atomic
     def save(self):
         data = self.cleaned_data
         # Create the user
@@ -95,25 +125,52 @@ class AdminCreateUserForm(forms.Form):
             roll_number=data['roll_number'],
             phone_number=data['phone_number'],
             gender=data['gender'],
-            room=data.get('room')  # May be None
         )
         
-        # Update room availability if assigned
+        # Take the bed atomically; RoomUnavailable rolls the whole student back
         if data.get('room'):
-            room = data['room']
-            room.is_available = False
-            room.save()
-            
+            assign_room(student, data['room'])
+        
         return student 
 
+class StudentImportRowForm(forms.Form):
+    """Field-level validation for one row of a student import file.
+
+    Uniqueness and room checks need the whole file and are done set-wise in
+    hostel.importer, not per row.
+    """
+    first_name = forms.CharField(max_length=30, required=True)
+    last_name = forms.CharField(max_length=30, required=True)
+    username = forms.CharField(max_length=150, required=True)
+    email = forms.EmailField(required=True)
+    password = forms.CharField(required=False)
+    roll_number = forms.CharField(max_length=20, required=True)
+    phone_number = forms.CharField(max_length=15, required=True)
+    gender = forms.ChoiceField(choices=Student.GENDER_CHOICES, required=True)
+    room = forms.CharField(max_length=10, required=False)
+
+class StudentImportForm(forms.Form):
+    # Students always get password reset links here: hashing a file's
+    # passwords takes a process pool, which belongs in
+    # `manage.py import_students --passwords hash`, not in a web worker
+    file = forms.FileField(help_text='CSV or XLSX with columns: first_name, last_name, username, email, '
+                                     'roll_number, phone_number, gender, room (optional)')
+    skip_invalid = forms.BooleanField(required=False, help_text='Import the valid rows even if some rows have errors')
+
 class RoomForm(forms.ModelForm):
     class Meta:
         model = Room
-        fields = ['room_number', 'room_type', 'capacity', 'is_available']
+        fields = ['room_number', 'block', 'room_type', 'capacity']
         
     def clean_room_number(self):
         room_number = self.cleaned_data.get('room_number')
         # Check if room number already exists when creating a new room
         if not self.instance.pk and Room.objects.filter(room_number=room_number).exists():
             raise forms.ValidationError("Room with this number already exists.")
-        return room_number 
\ No newline at end of file
+        return room_number
+    
+    def clean_capacity(self):
+        capacity = self.cleaned_data.get('capacity')
+        if capacity is not None and capacity < self.instance.occupant_count:
+            raise forms.ValidationError(f"Room currently has {self.instance.occupant_count} occupants.")
+        return capacity 
\ No newline at end of file
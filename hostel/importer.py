@@ -0,0 +1,211 @@
+import csv
+import io
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.db import transaction
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from .forms import StudentImportRowForm
+from .models import Student, Room
+from . import stats
+from .services import RoomUnavailable, check_room_gender, occupant_genders, update_room_occupancy
+
+BATCH_SIZE = 500
+# Below this many passwords a process pool costs more than it saves.
+POOL_THRESHOLD = 16
+
+
+class ImportResult:
+    """Outcome of a student import.
+
+    ``created`` holds ``(row_number, username, reset_link)`` tuples (the link
+    is None when passwords came from the file) and ``errors`` holds
+    ``(row_number, [messages])`` tuples. Row numbers match the spreadsheet,
+    so the header is row 1.
+    """
+    def __init__(self):
+        self.created = []
+        self.errors = []
+
+
+def read_rows(fileobj, filename):
+    """Read an uploaded CSV or XLSX file into a list of dicts keyed by lower-case header"""
+    if filename.lower().endswith('.xlsx'):
+        try:
+            import openpyxl
+        except ImportError:
+            raise ValueError('Reading XLSX files requires openpyxl (pip install openpyxl).')
+        sheet = openpyxl.load_workbook(fileobj, read_only=True, data_only=True).active
+        values = sheet.iter_rows(values_only=True)
+        header = [str(cell or '').strip().lower() for cell in next(values, ())]
+        return [
+            {key: '' if cell is None else str(cell).strip() for key, cell in zip(header, row)}
+            for row in values
+            if any(cell is not None for cell in row)
+        ]
+
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.DictReader(text)
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+        return [{key: (value or '').strip() for key, value in row.items() if key} for row in reader]
+    except UnicodeDecodeError:
+        raise ValueError('CSV files must be UTF-8 encoded.')
+    finally:
+        text.detach()
+
+
+def hash_passwords(passwords, workers=None):
+    """Hash passwords across a process pool, since each PBKDF2 hash is CPU bound"""
+    if len(passwords) < POOL_THRESHOLD:
+        return [make_password(password) for password in passwords]
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+        return list(pool.map(make_password, passwords, chunksize=8))
+
+
+def import_students(rows, passwords='reset', skip_invalid=False, workers=None):
+    """Validate and bulk-create students from parsed import rows.
+
+    Every row is validated before anything is written. Unless
+    ``skip_invalid`` is set, a single bad row aborts the whole import.
+    With ``passwords='reset'`` users get an unusable password and a
+    password reset link instead of a hashed password from the file.
+    ``passwords='hash'`` hashes in a process pool, so it is only offered
+    by the import_students command, never by a web request.
+    """
+    result = ImportResult()
+    valid = []
+    for row_number, row in enumerate(rows, start=2):
+        form = StudentImportRowForm(row)
+        if not form.is_valid():
+            result.errors.append((row_number, [
+                f'{field}: {message}' for field, messages in form.errors.items() for message in messages
+            ]))
+        elif passwords == 'hash' and not form.cleaned_data['password']:
+            result.errors.append((row_number, ['password: This field is required.']))
+        else:
+            valid.append((row_number, form.cleaned_data))
+
+    # Uniqueness is checked with one query per column rather than per row
+    usernames = Counter(data['username'] for _, data in valid)
+    roll_numbers = Counter(data['roll_number'] for _, data in valid)
+    taken_usernames = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    taken_roll_numbers = set(Student.objects.filter(roll_number__in=roll_numbers).values_list('roll_number', flat=True))
+
+    candidates = []
+    for row_number, data in valid:
+        messages = []
+        if data['username'] in taken_usernames:
+            messages.append('username: Username already exists')
+        elif usernames[data['username']] > 1:
+            messages.append('username: Username appears more than once in the file')
+        if data['roll_number'] in taken_roll_numbers:
+            messages.append('roll_number: Roll number already exists')
+        elif roll_numbers[data['roll_number']] > 1:
+            messages.append('roll_number: Roll number appears more than once in the file')
+        if messages:
+            result.errors.append((row_number, messages))
+        else:
+            candidates.append((row_number, data))
+    if not candidates or (result.errors and not skip_invalid):
+        result.errors.sort()
+        return result
+
+    # Hashed up front so the room locks below are not held while it runs
+    if passwords == 'hash':
+        encoded = hash_passwords([data['password'] for _, data in candidates], workers=workers)
+    else:
+        encoded = [make_password(None) for _ in candidates]
+
+    with transaction.atomic():
+        accepted = _place(candidates, encoded, result)
+        result.errors.sort()
+        if not accepted or (result.errors and not skip_invalid):
+            return result
+
+        for start in range(0, len(accepted), BATCH_SIZE):
+            batch = accepted[start:start + BATCH_SIZE]
+            users = [
+                User(
+                    username=data['username'],
+                    email=data['email'],
+                    password=password,
+                    first_name=data['first_name'],
+                    last_name=data['last_name'],
+                    is_staff=False,
+                )
+                for _, data, _, password in batch
+            ]
+            User.objects.bulk_create(users)
+            # Not every backend returns primary keys from a bulk insert
+            user_ids = dict(User.objects.filter(username__in=[user.username for user in users])
+                            .values_list('username', 'id'))
+            Student.objects.bulk_create([
+                Student(
+                    user_id=user_ids[data['username']],
+                    roll_number=data['roll_number'],
+                    phone_number=data['phone_number'],
+                    gender=data['gender'],
+                    room=room,
+                )
+                for _, data, room, _ in batch
+            ])
+            for (row_number, _, _, _), user in zip(batch, users):
+                user.pk = user_ids[user.username]
+                result.created.append((row_number, user.username, _reset_link(user) if passwords != 'hash' else None))
+
+        # bulk_create bypasses the model signals
+        update_room_occupancy({room.id for _, _, room, _ in accepted if room})
+
+    stats.invalidate('student_count')
+    stats.bump_roster_version()
+    stats.bump_generation(User, Student)
+
+    return result
+
+
+def _place(candidates, encoded, result):
+    """Check each candidate's room against locked rooms; returns ``(row_number, data, room, password)`` tuples.
+
+    The rooms stay locked until the import commits, so a concurrent
+    assign_room() cannot take the beds counted here, and the gender rule
+    is the one assign_room() applies.
+    """
+    rooms = {room.room_number: room for room in Room.objects.select_for_update().filter(
+        room_number__in={data['room'] for _, data in candidates if data['room']}
+    ).order_by('pk')}
+    free_beds = {room.id: room.capacity - room.occupant_count for room in rooms.values()}
+    genders = occupant_genders(free_beds)
+
+    accepted = []
+    for (row_number, data), password in zip(candidates, encoded):
+        room = rooms.get(data['room']) if data['room'] else None
+        if data['room'] and room is None:
+            result.errors.append((row_number, [f"room: Room {data['room']} does not exist"]))
+            continue
+        if room is not None:
+            try:
+                if free_beds[room.id] <= 0:
+                    raise RoomUnavailable(f"Room {data['room']} is not available")
+                check_room_gender(genders.get(room.id, set()), data['gender'])
+            except RoomUnavailable as error:
+                result.errors.append((row_number, [f'room: {error}']))
+                continue
+            free_beds[room.id] -= 1
+            genders.setdefault(room.id, set()).add(data['gender'])
+        accepted.append((row_number, data, room, password))
+    return accepted
+
+
+def _reset_link(user):
+    return reverse('password_reset_confirm', kwargs={
+        'uidb64': urlsafe_base64_encode(force_bytes(user.pk)),
+        'token': default_token_generator.make_token(user),
+    })
@@ -0,0 +1,33 @@
+import contextlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.db import connection, connections
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+
+@contextlib.contextmanager
+def throwaway_database(on_disk=False):
+    """Run the block against a freshly migrated test database, dropped afterwards.
+
+    With ``on_disk`` an SQLite test database is a real file rather than
+    shared-cache memory, so threads contend on ordinary database locks.
+    Configured read replicas point at the test database too.
+    """
+    if on_disk and connection.vendor == 'sqlite':
+        connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(), 'hostel_test.sqlite3')
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    replicas = {alias: dict(connections[alias].settings_dict) for alias in settings.HOSTEL_DATABASE_REPLICAS}
+    for alias in replicas:
+        connections[alias].close()
+        connections[alias].creation.set_as_test_mirror(connection.settings_dict)
+    try:
+        yield
+    finally:
+        for alias, settings_dict in replicas.items():
+            connections[alias].close()
+            connections[alias].settings_dict = settings_dict
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
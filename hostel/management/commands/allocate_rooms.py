@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from hostel.allocation import allocate_rooms
+from hostel.models import Student, Room
+
+
+class Command(BaseCommand):
+    help = 'Allocate all unassigned students to free beds in one pass'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Print the planned moves without saving them')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        plan = allocate_rooms(dry_run=options['dry_run'])
+        elapsed = time.perf_counter() - started
+
+        if options['dry_run']:
+            roll_numbers = dict(Student.objects.filter(
+                pk__in=[*plan.assignments, *plan.unplaced]
+            ).values_list('pk', 'roll_number'))
+            rooms = {
+                room.pk: room for room in Room.objects.filter(pk__in=set(plan.assignments.values()))
+            }
+            for student_id, room_id in sorted(plan.assignments.items(), key=lambda item: roll_numbers[item[0]]):
+                room = rooms[room_id]
+                self.stdout.write(f'+ {roll_numbers[student_id]} -> {room.room_number} ({room.get_room_type_display()})')
+            for student_id in plan.unplaced:
+                self.stdout.write(f'! {roll_numbers[student_id]} -> no free bed')
+
+        verb = 'Would allocate' if options['dry_run'] else 'Allocated'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {len(plan.assignments)} students to {len(set(plan.assignments.values()))} rooms '
+            f'in {elapsed:.2f}s; {len(plan.unplaced)} left without a bed'
+        ))
@@ -0,0 +1,157 @@
+import contextlib
+import json
+import statistics
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from hostel.datagen import generate
+from hostel.models import Student, Room
+
+from ._testdb import throwaway_database
+
+
+def _bulk_attendance_data():
+    data = {'date': timezone.localdate().isoformat()}
+    for student_id in Student.objects.values_list('id', flat=True)[::2]:
+        data[f'student_{student_id}'] = 'on'
+    return data
+
+
+def _room_assignment_data():
+    room = Room.objects.filter(is_available=True).order_by('?').first()
+    return {'room': room.id if room else ''}
+
+
+# (name, user, method, url, POST data factory)
+SCENARIOS = [
+    ('dashboard (staff)', 'staff', 'get', '/dashboard/', None),
+    ('dashboard (student)', 'student', 'get', '/dashboard/', None),
+    ('room_list', 'student', 'get', '/rooms/', None),
+    ('admin_room_list', 'staff', 'get', '/manage/rooms/', None),
+    ('admin_attendance_list', 'staff', 'get', '/manage/attendance/', None),
+    ('attendance_bulk GET', 'staff', 'get', '/attendance/bulk/', None),
+    ('attendance_bulk POST', 'staff', 'post', '/attendance/bulk/', _bulk_attendance_data),
+    ('room_assignment GET', 'student', 'get', '/rooms/assign/', None),
+    ('room_assignment POST', 'student', 'post', '/rooms/assign/', _room_assignment_data),
+    ('profile', 'student', 'get', '/profile/', None),
+    ('announcement_list', 'student', 'get', '/announcements/', None),
+    ('admin_user_list', 'staff', 'get', '/manage/users/', None),
+    ('admin_attendance_analytics', 'staff', 'get', '/manage/attendance/analytics/', None),
+    ('admin_announcement_list', 'staff', 'get', '/manage/announcements/', None),
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the hot views against a throwaway database filled with synthetic data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=200)
+        parser.add_argument('--students', type=int, default=300)
+        parser.add_argument('--announcements', type=int, default=50)
+        parser.add_argument('--days', type=int, default=60)
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per view (after one warm-up)')
+        parser.add_argument('--only', nargs='*', help='Only run scenarios whose name contains one of these')
+        parser.add_argument('--json', dest='json_path', help='Write results to this file')
+        parser.add_argument('--baseline', help='Fail if results regress against this JSON file')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed relative wall-time slowdown against the baseline')
+        parser.add_argument('--no-fragment-cache', action='store_true',
+                            help='Render {%% cache %%} fragments on every request, to compare against caching them')
+
+    def handle(self, *args, **options):
+        with throwaway_database(), self.fragment_cache(not options['no_fragment_cache']):
+            generate(
+                rooms=options['rooms'],
+                students=options['students'],
+                announcements=options['announcements'],
+                days=options['days'],
+            )
+            results = self.run_scenarios(options)
+
+        self.report(results)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['tolerance'])
+
+    def fragment_cache(self, enabled):
+        if enabled:
+            return contextlib.nullcontext()
+        # {% cache %} prefers a cache named template_fragments over the default one
+        return override_settings(CACHES={
+            **settings.CACHES,
+            'template_fragments': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+        })
+
+    def run_scenarios(self, options):
+        clients = {'staff': Client(), 'student': Client()}
+        clients['staff'].force_login(User.objects.get(username='gen_staff'))
+        clients['student'].force_login(User.objects.get(username='gen000001'))
+
+        results = {}
+        for name, who, method, url, data_factory in SCENARIOS:
+            if options['only'] and not any(part in name for part in options['only']):
+                continue
+            client = clients[who]
+
+            def request():
+                data = data_factory() if data_factory else None
+                response = getattr(client, method)(url, data)
+                if response.status_code >= 400:
+                    raise CommandError(f'{name}: {url} returned {response.status_code}')
+                return response
+
+            request()  # warm-up
+            timings = []
+            for _ in range(options['repeat']):
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    response = request()
+                    timings.append((time.perf_counter() - start) * 1000)
+                queries = len(ctx.captured_queries)
+
+            # Peak memory is measured on a separate run since tracing slows everything down.
+            tracemalloc.start()
+            request()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results[name] = {
+                'wall_ms': round(statistics.median(timings), 2),
+                'queries': queries,
+                'peak_kb': round(peak / 1024, 1),
+                'bytes': len(response.content),
+            }
+        return results
+
+    def report(self, results):
+        self.stdout.write(f"{'view':<26}{'wall ms':>10}{'queries':>9}{'peak KB':>11}{'bytes':>11}")
+        for name, row in results.items():
+            self.stdout.write(
+                f"{name:<26}{row['wall_ms']:>10.2f}{row['queries']:>9}{row['peak_kb']:>11.1f}{row['bytes']:>11}"
+            )
+
+    def compare(self, results, baseline_path, tolerance):
+        with open(baseline_path) as fh:
+            baseline = json.load(fh)
+        failures = []
+        for name, row in results.items():
+            base = baseline.get(name)
+            if not base:
+                continue
+            if row['queries'] > base['queries']:
+                failures.append(f"{name}: {row['queries']} queries (baseline {base['queries']})")
+            if row['wall_ms'] > base['wall_ms'] * (1 + tolerance):
+                failures.append(f"{name}: {row['wall_ms']} ms (baseline {base['wall_ms']} ms)")
+        if failures:
+            raise CommandError('Benchmark regressions:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('No regressions against baseline'))
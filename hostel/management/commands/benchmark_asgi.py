@@ -0,0 +1,159 @@
+import asyncio
+import contextlib
+import importlib
+import itertools
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import clear_url_caches
+
+import hostel.urls
+from hostel.datagen import generate
+from hostel.models import Room
+
+from ._testdb import throwaway_database
+
+# (name, user, url); '{room}' is filled with a room id
+PAGES = [
+    ('dashboard (staff)', 'staff', '/dashboard/'),
+    ('dashboard (student)', 'student', '/dashboard/'),
+    ('room_list', 'student', '/rooms/'),
+    ('room_detail', 'student', '/rooms/{room}/'),
+    ('announcement_list', 'student', '/announcements/'),
+]
+
+
+@contextlib.contextmanager
+def _read_views(use_async):
+    """Re-import the URLconf with HOSTEL_ASYNC_VIEWS set to ``use_async``"""
+    def reload():
+        importlib.reload(hostel.urls)
+        importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+        clear_url_caches()
+
+    try:
+        with override_settings(HOSTEL_ASYNC_VIEWS=use_async):
+            reload()
+            yield
+    finally:
+        reload()
+
+
+def _summary(latencies, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'rps': len(latencies) / elapsed,
+        'p50_ms': statistics.median(latencies),
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+
+class Command(BaseCommand):
+    help = ('Compare latency and throughput of the read-heavy pages served by the sync views '
+            'through the WSGI handler and by the async views through the ASGI handler')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=200)
+        parser.add_argument('--students', type=int, default=300)
+        parser.add_argument('--announcements', type=int, default=50)
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--requests', type=int, default=200, help='Requests per run, spread over the pages')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32],
+                            help='Requests kept in flight; one run per value')
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            self.stdout.write('SQLite: queries from concurrent requests are serialized by the database lock')
+        with throwaway_database(on_disk=True):
+            generate(
+                rooms=options['rooms'],
+                students=options['students'],
+                announcements=options['announcements'],
+                days=options['days'],
+            )
+            room = Room.objects.filter(occupant_count__gt=0).values_list('pk', flat=True).first()
+            pages = [(name, who, url.format(room=room)) for name, who, url in PAGES]
+            cookies = {}
+            for who, username in (('staff', 'gen_staff'), ('student', 'gen000001')):
+                client = Client()
+                client.force_login(User.objects.get(username=username))
+                cookies[who] = client.cookies
+
+            self.stdout.write(f"{'handler':<9}{'in flight':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+            for concurrency in options['concurrency']:
+                jobs = list(itertools.islice(itertools.cycle(pages), options['requests']))
+                with _read_views(False):
+                    self.write_row('wsgi', concurrency, self.run_wsgi(jobs, cookies, concurrency))
+                with _read_views(True):
+                    self.write_row('asgi', concurrency, asyncio.run(self.run_asgi(jobs, cookies, concurrency)))
+
+    def write_row(self, handler, concurrency, row):
+        self.stdout.write(
+            f"{handler:<9}{concurrency:>10}{row['rps']:>10.1f}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+        )
+
+    def check_response(self, name, url, response):
+        if response.status_code != 200:
+            raise CommandError(f'{name}: {url} returned {response.status_code}')
+
+    def run_wsgi(self, jobs, cookies, concurrency):
+        """Sync views on ``concurrency`` threads, like a threaded WSGI worker"""
+        pending = iter(jobs)
+        lock = threading.Lock()
+        latencies = []
+
+        def worker():
+            clients = {who: Client() for who in cookies}
+            for who, client in clients.items():
+                client.cookies.update(cookies[who])
+            try:
+                while True:
+                    with lock:
+                        job = next(pending, None)
+                    if job is None:
+                        return
+                    name, who, url = job
+                    start = time.perf_counter()
+                    response = clients[who].get(url)
+                    elapsed = (time.perf_counter() - start) * 1000
+                    self.check_response(name, url, response)
+                    with lock:
+                        latencies.append(elapsed)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if len(latencies) != len(jobs):
+            raise CommandError('Some WSGI requests failed')
+        return _summary(latencies, time.perf_counter() - started)
+
+    async def run_asgi(self, jobs, cookies, concurrency):
+        """Async views with ``concurrency`` requests in flight on one event loop, like an ASGI worker"""
+        pending = iter(jobs)
+        latencies = []
+
+        async def worker():
+            clients = {who: AsyncClient() for who in cookies}
+            for who, client in clients.items():
+                client.cookies.update(cookies[who])
+            for name, who, url in pending:
+                start = time.perf_counter()
+                response = await clients[who].get(url)
+                latencies.append((time.perf_counter() - start) * 1000)
+                self.check_response(name, url, response)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return _summary(latencies, time.perf_counter() - started)
@@ -0,0 +1,131 @@
+import contextlib
+import io
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+
+from hostel.datagen import generate
+
+from ._testdb import throwaway_database
+
+PAGES = ['/dashboard/', '/rooms/', '/announcements/', '/api/rooms/']
+
+# Connection settings of the "before" run: a fresh connection for every
+# request, without a pool or SQLite pragmas
+PER_REQUEST = {'CONN_MAX_AGE': 0, 'OPTIONS': {'pool': None, 'init_command': None}}
+
+
+class Command(BaseCommand):
+    help = ('Measure requests per second of one threaded worker with a new database connection per request '
+            'against the configured persistent connections, pool and pragmas')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help='Threads in the worker, like gunicorn --threads')
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument('--students', type=int, default=300)
+        parser.add_argument('--rooms', type=int, default=100)
+
+    def handle(self, *args, **options):
+        settings_dict = connection.settings_dict
+        self.stdout.write(
+            f"{connection.vendor}: CONN_MAX_AGE={settings_dict['CONN_MAX_AGE']}, "
+            f"pool={settings_dict['OPTIONS'].get('pool') or 'off'}"
+        )
+        with throwaway_database(on_disk=True):
+            generate(rooms=options['rooms'], students=options['students'], announcements=20, days=14)
+            client = Client()
+            client.force_login(User.objects.get(username='gen_staff'))
+            cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+
+            # Fill the template and stats caches so neither run pays for them
+            self.run_worker(cookie, dict(options, requests=len(PAGES), threads=1))
+            results = {}
+            for label, overrides in (('per-request connections', PER_REQUEST), ('configured', {})):
+                with self.connection_settings(overrides):
+                    results[label] = self.run_worker(cookie, options)
+
+        self.stdout.write(f"{'connections':<26}{'req/s':>9}{'ms/req':>9}{'opened':>9}")
+        for label, (rate, opened) in results.items():
+            self.stdout.write(f'{label:<26}{rate:>9.1f}{1000 / rate:>9.2f}{opened:>9}')
+
+    @contextlib.contextmanager
+    def connection_settings(self, overrides):
+        """Apply ``overrides`` to every database's settings (replicas too) for the block; None removes an option"""
+        saved = {}
+        for alias in connections:
+            settings_dict = connections[alias].settings_dict
+            saved[alias] = {key: settings_dict[key] for key in ('CONN_MAX_AGE', 'OPTIONS')}
+            options = dict(settings_dict['OPTIONS'])
+            for key, value in overrides.get('OPTIONS', {}).items():
+                if value is None:
+                    options.pop(key, None)
+                else:
+                    options[key] = value
+            settings_dict.update(OPTIONS=options, CONN_MAX_AGE=overrides.get('CONN_MAX_AGE', settings_dict['CONN_MAX_AGE']))
+        self.close_all()
+        try:
+            yield
+        finally:
+            self.close_all()
+            for alias, values in saved.items():
+                connections[alias].settings_dict.update(values)
+
+    def close_all(self):
+        connections.close_all()
+        for alias in connections:
+            if hasattr(connections[alias], 'close_pool'):
+                connections[alias].close_pool()
+
+    def run_worker(self, cookie, options):
+        """Serve ``--requests`` requests through the WSGI handler from ``--threads`` threads"""
+        handler = WSGIHandler()
+        pending = iter(range(options['requests']))
+        lock = threading.Lock()
+        opened = []
+        errors = []
+
+        def count_connection(sender, connection, **kwargs):
+            opened.append(1)
+
+        def worker():
+            try:
+                while True:
+                    with lock:
+                        index = next(pending, None)
+                    if index is None:
+                        return
+                    status = []
+                    environ = {
+                        'REQUEST_METHOD': 'GET', 'PATH_INFO': PAGES[index % len(PAGES)], 'QUERY_STRING': '',
+                        'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'HTTP_HOST': 'testserver',
+                        'HTTP_COOKIE': cookie, 'wsgi.input': io.BytesIO(), 'wsgi.url_scheme': 'http',
+                    }
+                    response = handler(environ, lambda line, headers: status.append(line))
+                    b''.join(response)
+                    response.close()
+                    if not status[0].startswith('200'):
+                        errors.append(f"{environ['PATH_INFO']} answered {status[0]}")
+            finally:
+                connection.close()
+
+        connection_created.connect(count_connection)
+        try:
+            threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            connection_created.disconnect(count_connection)
+        if errors:
+            raise CommandError(errors[0])
+        return options['requests'] / elapsed, len(opened)
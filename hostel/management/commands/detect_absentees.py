@@ -0,0 +1,42 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+
+from hostel.absentees import run
+from hostel.models import Student
+
+
+class Command(BaseCommand):
+    help = 'Flag students with long absence streaks or a sudden drop in weekly attendance (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=datetime.date.fromisoformat,
+                            help='Last day to score (YYYY-MM-DD, default today)')
+        parser.add_argument('--window', type=int, default=365, help='Days of history to load')
+        parser.add_argument('--streak', type=int, default=3, help='Flag this many consecutive absences')
+        parser.add_argument('--drop', type=float, default=30.0,
+                            help='Flag a weekly attendance drop of this many percentage points')
+        parser.add_argument('--dry-run', action='store_true', help='Print the flagged students without saving them')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        flags = run(
+            dry_run=options['dry_run'],
+            end=options['date'],
+            window=options['window'],
+            streak=options['streak'],
+            drop=options['drop'],
+        )
+        elapsed = time.perf_counter() - started
+
+        if options['dry_run']:
+            roll_numbers = dict(Student.objects.filter(
+                pk__in=[flag.student_id for flag in flags]
+            ).values_list('pk', 'roll_number'))
+            for flag in flags:
+                drop = f'{flag.rate_drop:.0f} pts' if flag.rate_drop is not None else '-'
+                self.stdout.write(f'! {roll_numbers[flag.student_id]}: {flag.absence_streak} days absent, drop {drop}')
+
+        verb = 'Would flag' if options['dry_run'] else 'Flagged'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(flags)} students in {elapsed:.2f}s'))
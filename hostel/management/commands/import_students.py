@@ -0,0 +1,50 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hostel.importer import read_rows, import_students
+
+
+class Command(BaseCommand):
+    help = 'Bulk-create students from a CSV or XLSX file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XLSX file with one student per row')
+        parser.add_argument('--passwords', choices=['reset', 'hash'], default='reset',
+                            help="'reset' issues password reset links, 'hash' uses the file's password column")
+        parser.add_argument('--skip-invalid', action='store_true', help='Import valid rows even if others fail')
+        parser.add_argument('--workers', type=int, help='Processes used to hash passwords')
+        parser.add_argument('--report', help='Write a per-row CSV report (errors and reset links) to this path')
+        parser.add_argument('--base-url', default='', help='Prefix for reset links, e.g. https://hostel.example')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as fh:
+                rows = read_rows(fh, options['path'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        result = import_students(
+            rows,
+            passwords=options['passwords'],
+            skip_invalid=options['skip_invalid'],
+            workers=options['workers'],
+        )
+
+        for row_number, errors in result.errors:
+            self.stderr.write(f"Row {row_number}: {'; '.join(errors)}")
+        if options['report']:
+            with open(options['report'], 'w', newline='') as fh:
+                writer = csv.writer(fh)
+                writer.writerow(['row', 'status', 'username', 'detail'])
+                for row_number, username, reset_link in result.created:
+                    link = options['base_url'] + reset_link if reset_link else ''
+                    writer.writerow([row_number, 'created', username, link])
+                for row_number, errors in result.errors:
+                    writer.writerow([row_number, 'error', '', '; '.join(errors)])
+
+        if result.errors and not result.created:
+            raise CommandError(f'{len(result.errors)} rows have errors; nothing was imported')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {len(result.created)} students ({len(result.errors)} rows skipped)'
+        ))
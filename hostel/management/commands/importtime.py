@@ -0,0 +1,105 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter: import the WSGI module, then serve one request
+# the way a serverless cold start does.
+CHILD = '''
+import io, json, sys, time
+start = time.perf_counter()
+from hostel_management.wsgi import application
+imported = time.perf_counter()
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': sys.argv[1], 'QUERY_STRING': '',
+    'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+    'wsgi.input': io.BytesIO(), 'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr,
+}
+status = []
+b''.join(application(environ, lambda line, headers: status.append(line)))
+done = time.perf_counter()
+print(json.dumps({
+    'status': status[0], 'modules': len(sys.modules),
+    'import_ms': (imported - start) * 1000, 'request_ms': (done - imported) * 1000,
+}))
+'''
+
+
+def parse_importtime(stderr):
+    """``(module, self µs, cumulative µs)`` for each line ``-X importtime`` printed"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(own), int(cumulative)))
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Profile imports during a cold start (WSGI import plus one request) and enforce a budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/login/', help='Request served after the import')
+        parser.add_argument('--runs', type=int, default=5, help='Cold starts to time; the median is reported')
+        parser.add_argument('--top', type=int, default=20, help='Slowest modules to list')
+        parser.add_argument('--lean', action='store_true', help='Set HOSTEL_LEAN_STARTUP for the cold starts')
+        parser.add_argument('--budget', type=float, help='Fail if the median cold start takes longer (ms)')
+        parser.add_argument('--max-modules', type=int, help='Fail if a cold start imports more modules')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'hostel_management.settings'))
+        if options['lean']:
+            env['HOSTEL_LEAN_STARTUP'] = 'true'
+
+        # Profiled once; -X importtime slows imports down, so the timed runs go without it
+        _, stderr = self.cold_start(options['path'], env, profile=True)
+        imports = parse_importtime(stderr)
+        runs = [self.cold_start(options['path'], env)[0] for _ in range(max(options['runs'], 1))]
+
+        self.report(imports, options['top'])
+        total = [run['import_ms'] + run['request_ms'] for run in runs]
+        run = runs[0]
+        self.stdout.write(
+            f"\nCold start ({run['status']}, {run['modules']} modules): "
+            f"median {statistics.median(total):.0f} ms over {len(runs)} runs "
+            f"(import {statistics.median(r['import_ms'] for r in runs):.0f} ms, "
+            f"first request {statistics.median(r['request_ms'] for r in runs):.0f} ms)"
+        )
+
+        failures = []
+        if options['budget'] and statistics.median(total) > options['budget']:
+            failures.append(f"median cold start {statistics.median(total):.0f} ms exceeds the {options['budget']:.0f} ms budget")
+        if options['max_modules'] and run['modules'] > options['max_modules']:
+            failures.append(f"{run['modules']} modules imported, budget is {options['max_modules']}")
+        if failures:
+            raise CommandError('Cold start over budget: ' + '; '.join(failures))
+        if options['budget'] or options['max_modules']:
+            self.stdout.write(self.style.SUCCESS('Cold start within budget'))
+
+    def cold_start(self, path, env, profile=False):
+        command = [sys.executable] + (['-X', 'importtime'] if profile else []) + ['-c', CHILD, path]
+        result = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        if result.returncode:
+            raise CommandError(f'Cold start failed:\n{result.stderr[-2000:]}')
+        run = json.loads(result.stdout.strip().splitlines()[-1])
+        if not run['status'].startswith(('2', '3')):
+            raise CommandError(f"{path} answered {run['status']}")
+        return run, result.stderr
+
+    def report(self, imports, top):
+        self.stdout.write(f"{'slowest modules (self)':<56}{'self ms':>9}{'cumul. ms':>11}")
+        for name, own, cumulative in sorted(imports, key=lambda row: -row[1])[:top]:
+            self.stdout.write(f'{name[:55]:<56}{own / 1000:>9.1f}{cumulative / 1000:>11.1f}')
+
+        packages = {}
+        for name, own, _ in imports:
+            package = name.split('.')[0]
+            packages[package] = packages.get(package, 0) + own
+        self.stdout.write(f"\n{'by top-level package':<56}{'ms':>9}")
+        for package, own in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'{package:<56}{own / 1000:>9.1f}')
@@ -0,0 +1,21 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from hostel import bitmaps
+from hostel.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the attendance rollups and bitmaps from raw attendance'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=datetime.date.fromisoformat,
+                            help='Only rebuild from this date (YYYY-MM-DD, rounded down to the month)')
+
+    def handle(self, *args, **options):
+        days, months = rebuild(since=options['since'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {days} daily room summaries and {months} monthly student rollups'))
+        if bitmaps.enabled():
+            packed = bitmaps.rebuild(since=options['since'])
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {packed} monthly attendance bitmaps'))
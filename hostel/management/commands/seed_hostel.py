@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from hostel.datagen import AlreadySeeded, generate
+
+
+class Command(BaseCommand):
+    help = 'Fill the database with synthetic rooms, students, announcements and attendance history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=200)
+        parser.add_argument('--students', type=int, default=500)
+        parser.add_argument('--announcements', type=int, default=50)
+        parser.add_argument('--days', type=int, default=730, help='Days of attendance history per student')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--replace', action='store_true',
+                            help='Delete rows left by an earlier run with the same keys instead of failing')
+
+    def handle(self, *args, **options):
+        try:
+            counts = generate(
+                rooms=options['rooms'],
+                students=options['students'],
+                announcements=options['announcements'],
+                days=options['days'],
+                seed=options['seed'],
+                stdout=self.stdout,
+                replace=options['replace'],
+            )
+        except AlreadySeeded as e:
+            raise CommandError(f'{e} Run with --replace to delete them first.')
+        self.stdout.write(self.style.SUCCESS(
+            'Seeded {rooms} rooms, {students} students, {announcements} announcements '
+            'and {attendance} attendance records'.format(**counts)
+        ))
@@ -0,0 +1,114 @@
+import queue
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, OperationalError
+from django.db.models import Count, F, Sum
+
+from hostel.datagen import generate, ROOM_CAPACITY
+from hostel.models import Student, Room
+from hostel.services import assign_room, allocate_room, RoomUnavailable
+
+from ._testdb import throwaway_database
+
+
+class Command(BaseCommand):
+    help = 'Hammer the room assignment service from many threads and check that no room is over-allocated'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=32)
+        parser.add_argument('--students', type=int, default=600)
+        parser.add_argument('--rooms', type=int, default=100)
+        parser.add_argument('--hot-rooms', type=int, default=10,
+                            help='Requests for specific rooms all target this many rooms')
+        parser.add_argument('--moves', type=int, default=2, help='Room requests per student')
+        parser.add_argument('--mode', choices=['specific', 'any'], default='specific',
+                            help="'specific' requests a chosen room, 'any' takes the first free room")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            self.stdout.write('SQLite fallback mode: writers are serialized by the database lock')
+        with throwaway_database(on_disk=True):
+            self.setup_data(options)
+            outcome, elapsed = self.run_workers(options)
+            over, drift, assigned, occupied = self.verify()
+
+        total = sum(outcome.values())
+        self.stdout.write(
+            f"{total} requests from {options['threads']} threads in {elapsed:.2f}s "
+            f"({total / elapsed:.0f} req/s): {outcome['assigned']} assigned, "
+            f"{outcome['full']} rejected as full, {outcome['failed']} failed after retries"
+        )
+        self.stdout.write(f'{assigned} students housed, {occupied} beds counted as occupied')
+        if over or drift or assigned != occupied:
+            raise CommandError(f'{over} rooms over capacity, {drift} rooms with a wrong occupant_count')
+        self.stdout.write(self.style.SUCCESS('No over-allocation'))
+
+    def setup_data(self, options):
+        generate(rooms=0, students=options['students'], announcements=0, days=0, seed=options['seed'])
+        rng = random.Random(options['seed'])
+        rooms = []
+        for i in range(options['rooms']):
+            room_type = rng.choice('SDT')
+            rooms.append(Room(room_number=f'X{i + 1:05d}', room_type=room_type, capacity=ROOM_CAPACITY[room_type]))
+        Room.objects.bulk_create(rooms)
+
+    def run_workers(self, options):
+        rng = random.Random(options['seed'])
+        students = list(Student.objects.only('pk', 'gender'))
+        room_ids = list(Room.objects.values_list('pk', flat=True))
+        hot = room_ids[:options['hot_rooms']] or room_ids
+
+        requests = queue.Queue()
+        for _ in range(options['moves']):
+            for student in rng.sample(students, len(students)):
+                requests.put((student, rng.choice(hot)))
+
+        outcome = {'assigned': 0, 'full': 0, 'failed': 0}
+        lock = threading.Lock()
+        start_line = threading.Barrier(options['threads'])
+
+        def worker():
+            start_line.wait()
+            try:
+                while True:
+                    try:
+                        student, room_id = requests.get_nowait()
+                    except queue.Empty:
+                        return
+                    try:
+                        if options['mode'] == 'any':
+                            allocate_room(student)
+                        else:
+                            assign_room(student, room_id)
+                        result = 'assigned'
+                    except RoomUnavailable:
+                        result = 'full'
+                    except OperationalError:
+                        result = 'failed'
+                    with lock:
+                        outcome[result] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcome, time.perf_counter() - started
+
+    def verify(self):
+        over = Room.objects.filter(occupant_count__gt=F('capacity')).count()
+        drift = (
+            Room.objects.annotate(actual=Count('student'))
+            .exclude(occupant_count=F('actual'))
+            .count()
+        )
+        assigned = Student.objects.filter(room__isnull=False).count()
+        occupied = Room.objects.aggregate(total=Sum('occupant_count'))['total'] or 0
+        return over, drift, assigned, occupied
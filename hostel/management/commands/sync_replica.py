@@ -0,0 +1,44 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = ('Copy the SQLite primary database into the SQLite replicas in DATABASE_REPLICA_URLS, '
+            'standing in for replication during local testing')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float,
+                            help='Keep copying every this many seconds, like a replica with that much lag')
+
+    def handle(self, *args, **options):
+        primary = connections['default'].settings_dict
+        replicas = [connections[alias].settings_dict for alias in settings.HOSTEL_DATABASE_REPLICAS]
+        if not replicas:
+            raise CommandError('No replicas configured; set DATABASE_REPLICA_URLS.')
+        engines = {primary['ENGINE']} | {replica['ENGINE'] for replica in replicas}
+        if engines != {'django.db.backends.sqlite3'}:
+            raise CommandError('sync_replica only copies between SQLite files; use the server\'s replication.')
+
+        while True:
+            started = time.perf_counter()
+            for replica in replicas:
+                self.copy(primary['NAME'], replica['NAME'])
+            self.stdout.write(
+                f"Copied {primary['NAME']} to {len(replicas)} replica(s) in {(time.perf_counter() - started) * 1000:.0f} ms"
+            )
+            if not options['every']:
+                return
+            time.sleep(options['every'])
+
+    def copy(self, source, target):
+        # The backup API takes a consistent snapshot while the primary keeps serving writes
+        primary, replica = sqlite3.connect(source), sqlite3.connect(target)
+        try:
+            primary.backup(replica)
+        finally:
+            primary.close()
+            replica.close()
@@ -0,0 +1,229 @@
+import json
+import logging
+import random
+import sys
+import time
+from contextlib import ExitStack
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import FileResponse
+from django.template.base import Node
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+from . import routers
+from .models import Student
+
+logger = logging.getLogger('hostel.instrumentation')
+
+
+def _template_location():
+    """Return ``template:line`` of the innermost template node on the stack, if any"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        node = frame.f_locals.get('self')
+        if isinstance(node, Node) and getattr(node, 'token', None) is not None:
+            return f'{node.origin.template_name}:{node.token.lineno}'
+        frame = frame.f_back
+    return None
+
+
+class QueryRecorder:
+    """execute_wrapper that times every query and spots repeated SQL"""
+    def __init__(self, duplicate_threshold):
+        self.duplicate_threshold = duplicate_threshold
+        self.count = 0
+        self.duration = 0.0
+        self.seen = {}
+        self.locations = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            seen = self.seen[sql] = self.seen.get(sql, 0) + 1
+            # The stack is only walked once per repeated statement
+            if seen == self.duplicate_threshold:
+                self.locations[sql] = _template_location()
+
+    def duplicates(self):
+        return [
+            {'sql': sql[:300], 'count': self.seen[sql], 'template': location}
+            for sql, location in self.locations.items()
+        ]
+
+
+class QueryInstrumentationMiddleware:
+    """Record wall time, query count, DB time and repeated queries per request.
+
+    Enabled with HOSTEL_INSTRUMENTATION; HOSTEL_INSTRUMENTATION_SAMPLE_RATE
+    limits it to a fraction of requests so it can stay on in production.
+    Sampled responses get a Server-Timing header and one JSON log line on
+    the ``hostel.instrumentation`` logger. Statements repeated at least
+    HOSTEL_INSTRUMENTATION_DUPLICATE_THRESHOLD times are reported with the
+    template line that issued them, which is how N+1 loops show up.
+    Streamed bodies are recorded while they are sent and logged afterwards.
+    """
+    def __init__(self, get_response):
+        if not getattr(settings, 'HOSTEL_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'HOSTEL_INSTRUMENTATION_SAMPLE_RATE', 1.0)
+        self.duplicate_threshold = getattr(settings, 'HOSTEL_INSTRUMENTATION_DUPLICATE_THRESHOLD', 3)
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        recorder = QueryRecorder(self.duplicate_threshold)
+        start = time.perf_counter()
+        with self.recording(recorder):
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+        db_ms = recorder.duration * 1000
+
+        # For streamed bodies this covers the time until the body starts
+        response['Server-Timing'] = (
+            f'total;dur={total_ms:.1f}, '
+            f'db;dur={db_ms:.1f};desc="{recorder.count} queries"'
+        )
+        if not response.streaming or isinstance(response, FileResponse):
+            self.log(request, response, recorder, start, body=None)
+        elif response.is_async:
+            # An async body queries from other threads' connections, which
+            # cannot be wrapped from here
+            self.log(request, response, recorder, start, body='unmeasured')
+        else:
+            response.streaming_content = self.record_body(
+                request, response, response.streaming_content, recorder, start,
+            )
+        return response
+
+    def recording(self, recorder):
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+        return stack
+
+    def record_body(self, request, response, content, recorder, start):
+        """Iterate a streamed body with queries recorded, logging once it is sent"""
+        try:
+            with self.recording(recorder):
+                yield from content
+        finally:
+            self.log(request, response, recorder, start, body='streamed')
+
+    def log(self, request, response, recorder, start, body):
+        duplicates = recorder.duplicates()
+        match = request.resolver_match
+        logger.log(logging.WARNING if duplicates else logging.INFO, json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - start) * 1000, 2),
+            'queries': recorder.count,
+            'db_ms': round(recorder.duration * 1000, 2),
+            'duplicates': duplicates,
+            'body': body,
+        }))
+
+
+class ReplicaRoutingMiddleware:
+    """Serve the reads of read-only requests from a database replica.
+
+    GET and HEAD requests read from one of HOSTEL_DATABASE_REPLICAS. Any
+    other request runs against the primary and sets a cookie that keeps the
+    browser's reads on the primary for HOSTEL_REPLICA_STICKY_SECONDS, so
+    the page it is redirected to shows what it just saved despite
+    replication lag. Not used when no replicas are configured.
+
+    Like MiddlewareMixin it runs in async mode when the rest of the chain
+    is async, so async views under ASGI are routed as well.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not routers.replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sticky_seconds = getattr(settings, 'HOSTEL_REPLICA_STICKY_SECONDS', 10)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if request.method not in ('GET', 'HEAD'):
+            return self.stick(self.get_response(request))
+        if routers.STICKY_COOKIE in request.COOKIES:
+            return self.get_response(request)
+        with routers.replica_reads():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        # The context variable set here is copied into sync_to_async threads
+        if request.method not in ('GET', 'HEAD'):
+            return self.stick(await self.get_response(request))
+        if routers.STICKY_COOKIE in request.COOKIES:
+            return await self.get_response(request)
+        with routers.replica_reads():
+            return await self.get_response(request)
+
+    def stick(self, response):
+        response.set_cookie(
+            routers.STICKY_COOKIE, '1', max_age=self.sticky_seconds, httponly=True, samesite='Lax',
+        )
+        return response
+
+
+def _remember_student(request, user, student):
+    if student is not None:
+        # Fills user.student too, so templates reading it don't query again
+        user.student = student
+    request._cached_student = student
+    return student
+
+
+def get_student(request):
+    """The logged-in user's Student with its room, or None; loaded at most once per request"""
+    if not hasattr(request, '_cached_student'):
+        user = request.user
+        student = None
+        if user.is_authenticated:
+            student = Student.objects.select_related('room').filter(user=user).first()
+        _remember_student(request, user, student)
+    return request._cached_student
+
+
+async def aget_student(request):
+    """get_student() for async views"""
+    if not hasattr(request, '_cached_student'):
+        user = await request.auser()
+        student = None
+        if user.is_authenticated:
+            student = await Student.objects.select_related('room').filter(user=user).afirst()
+        _remember_student(request, user, student)
+    return request._cached_student
+
+
+class StudentMiddleware(MiddlewareMixin):
+    """Give every request a lazy ``request.student``, and ``request.astudent()`` for async views.
+
+    Like ``request.user``, nothing is queried until it is used. It is the
+    logged-in user's Student with ``room`` loaded, or falsy for anonymous
+    users and users without a student profile; test it with
+    ``if request.student``, not ``is None``.
+    """
+    def process_request(self, request):
+        request.student = SimpleLazyObject(lambda: get_student(request))
+        request.astudent = partial(aget_student, request)
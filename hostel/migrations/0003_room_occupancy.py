@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:00
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_occupancy(apps, schema_editor):
+    Room = apps.get_model('hostel', 'Room')
+    Student = apps.get_model('hostel', 'Student')
+    counts = dict(
+        Student.objects.filter(room__isnull=False).values_list('room').annotate(n=Count('id')).order_by()
+    )
+    rooms = list(Room.objects.all())
+    for room in rooms:
+        room.occupant_count = counts.get(room.id, 0)
+        room.is_available = room.occupant_count < room.capacity
+    Room.objects.bulk_update(rooms, ['occupant_count', 'is_available'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostel', '0002_attendance_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='occupant_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='room',
+            name='is_available',
+            field=models.BooleanField(db_index=True, default=True, editable=False),
+        ),
+        migrations.RunPython(backfill_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostel', '0003_room_occupancy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='room_preference',
+            field=models.CharField(blank=True, choices=[('S', 'Single'), ('D', 'Double'), ('T', 'Triple')], max_length=1),
+        ),
+    ]
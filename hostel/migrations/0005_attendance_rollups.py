@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostel', '0004_student_room_preference'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='block',
+            field=models.CharField(blank=True, db_index=True, max_length=20),
+        ),
+        migrations.CreateModel(
+            name='AttendanceDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('room', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='hostel.room')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='daily_summary_date_idx')],
+                'unique_together': {('room', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='StudentMonthlyAttendance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('present_days', models.PositiveIntegerField(default=0)),
+                ('recorded_days', models.PositiveIntegerField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='hostel.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month'], name='monthly_attendance_month_idx')],
+                'unique_together': {('student', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostel', '0005_attendance_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceBitmap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('present_mask', models.PositiveIntegerField(default=0)),
+                ('recorded_mask', models.PositiveIntegerField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='hostel.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month'], name='attendance_bitmap_month_idx')],
+                'unique_together': {('student', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostel', '0006_attendance_bitmap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AbsenteeFlag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('detected_on', models.DateField()),
+                ('absence_streak', models.PositiveIntegerField(help_text='Consecutive recorded absences up to detected_on')),
+                ('recent_rate', models.FloatField(blank=True, help_text='Attendance % over the last week', null=True)),
+                ('baseline_rate', models.FloatField(blank=True, help_text='Attendance % over the four weeks before', null=True)),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='hostel.student')),
+            ],
+            options={
+                'ordering': ['-absence_streak', 'recent_rate'],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:16
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostel', '0008_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='recorded_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:25
+
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def backfill_updated_at(apps, schema_editor):
+    Announcement = apps.get_model('hostel', 'Announcement')
+    Announcement.objects.update(updated_at=F('date_posted'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostel', '0009_attendance_recorded_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='announcement',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
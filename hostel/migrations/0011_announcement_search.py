@@ -0,0 +1,91 @@
+# Full-text index over announcement titles and content (see hostel/search.py).
+# The index lives outside the model: a tsvector column with a GIN index on
+# PostgreSQL, an FTS5 table on SQLite. Both are kept current by triggers, so
+# bulk_create() and queryset updates are indexed too. Other databases get
+# nothing and search falls back to substring matching.
+
+from django.db import migrations
+
+POSTGRESQL_FORWARDS = [
+    'ALTER TABLE hostel_announcement ADD COLUMN search_vector tsvector',
+    """
+    CREATE FUNCTION hostel_announcement_search_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('pg_catalog.english', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('pg_catalog.english', coalesce(NEW.content, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER hostel_announcement_search_update
+    BEFORE INSERT OR UPDATE OF title, content ON hostel_announcement
+    FOR EACH ROW EXECUTE FUNCTION hostel_announcement_search_update()
+    """,
+    # Fires the trigger for the existing rows
+    'UPDATE hostel_announcement SET title = title',
+    'CREATE INDEX hostel_announcement_search_idx ON hostel_announcement USING gin (search_vector)',
+]
+
+POSTGRESQL_BACKWARDS = [
+    'DROP TRIGGER hostel_announcement_search_update ON hostel_announcement',
+    'DROP FUNCTION hostel_announcement_search_update()',
+    'ALTER TABLE hostel_announcement DROP COLUMN search_vector',
+]
+
+SQLITE_FORWARDS = [
+    # External content table: stores only the index and reads text from hostel_announcement
+    """
+    CREATE VIRTUAL TABLE hostel_announcement_fts USING fts5(
+        title, content, content='hostel_announcement', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER hostel_announcement_fts_insert AFTER INSERT ON hostel_announcement BEGIN
+        INSERT INTO hostel_announcement_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER hostel_announcement_fts_delete AFTER DELETE ON hostel_announcement BEGIN
+        INSERT INTO hostel_announcement_fts (hostel_announcement_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER hostel_announcement_fts_update AFTER UPDATE OF title, content ON hostel_announcement BEGIN
+        INSERT INTO hostel_announcement_fts (hostel_announcement_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO hostel_announcement_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+    "INSERT INTO hostel_announcement_fts (hostel_announcement_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARDS = [
+    'DROP TRIGGER hostel_announcement_fts_insert',
+    'DROP TRIGGER hostel_announcement_fts_delete',
+    'DROP TRIGGER hostel_announcement_fts_update',
+    'DROP TABLE hostel_announcement_fts',
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql, params=None)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostel', '0010_announcement_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'postgresql': POSTGRESQL_FORWARDS, 'sqlite': SQLITE_FORWARDS}),
+            _run({'postgresql': POSTGRESQL_BACKWARDS, 'sqlite': SQLITE_BACKWARDS}),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:35
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def merge_unassigned_duplicates(apps, schema_editor):
+    # Concurrent refreshes could each insert an unassigned row for the same
+    # day; recount those days from the raw attendance into a single row
+    Attendance = apps.get_model('hostel', 'Attendance')
+    AttendanceDailySummary = apps.get_model('hostel', 'AttendanceDailySummary')
+    unassigned = AttendanceDailySummary.objects.filter(room__isnull=True)
+    dates = list(unassigned.values('date').annotate(n=Count('id')).filter(n__gt=1).values_list('date', flat=True))
+    if not dates:
+        return
+    unassigned.filter(date__in=dates).delete()
+    AttendanceDailySummary.objects.bulk_create([
+        AttendanceDailySummary(date=row['date'], present=row['present'], total=row['total'])
+        for row in Attendance.objects.filter(student__room__isnull=True, date__in=dates).values('date')
+        .annotate(present=Count('id', filter=Q(is_present=True)), total=Count('id')).order_by()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostel', '0011_announcement_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_unassigned_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='attendancedailysummary',
+            constraint=models.UniqueConstraint(condition=models.Q(('room__isnull', True)), fields=('date',), name='daily_summary_unassigned_uniq'),
+        ),
+    ]
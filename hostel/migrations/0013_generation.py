@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:38
+
+import hostel.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostel', '0012_daily_summary_unassigned_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Generation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('token', models.CharField(default=hostel.models._generation_token, editable=False, max_length=8)),
+                ('value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -1,4 +1,7 @@
-from django.db import models
+import uuid
+
+from django.db import models, transaction
+from django.db.models import Case, Value, When
 from django.contrib.auth.models import User
 from django.utils import timezone
 
@@ -12,12 +15,39 @@ class Room(models.Model):
     )
     
     room_number = models.CharField(max_length=10, unique=True)
+    block = models.CharField(max_length=20, blank=True, db_index=True)
     room_type = models.CharField(max_length=1, choices=ROOM_TYPES)
     capacity = models.IntegerField(default=1)
-    is_available = models.BooleanField(default=True)
+    occupant_count = models.PositiveIntegerField(default=0, editable=False)
+    # Derived from occupant_count < capacity; stored so "free rooms" is an indexed filter
+    is_available = models.BooleanField(default=True, db_index=True, editable=False)
     
     def __str__(self):
         return f"Room {self.room_number} ({self.get_room_type_display()})"
+    
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.is_available = self.occupant_count < self.capacity
+            return super().save(*args, **kwargs)
+        # occupant_count is only moved by the conditional UPDATEs in
+        # services.py; writing back the value loaded with this instance would
+        # undo assignments made since. Availability is derived in SQL from
+        # the stored count and the new capacity, before the other fields are
+        # written, so post_save receivers see the final row.
+        derived = {'occupant_count', 'is_available'}
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            update_fields = [field.attname for field in self._meta.concrete_fields if not field.primary_key]
+        kwargs['update_fields'] = [name for name in update_fields if name not in derived]
+        with transaction.atomic():
+            Room.objects.filter(pk=self.pk).update(is_available=Case(
+                When(occupant_count__lt=self.capacity, then=Value(True)), default=Value(False),
+            ))
+            self.occupant_count, self.is_available = (
+                Room.objects.filter(pk=self.pk).values_list('occupant_count', 'is_available').get()
+            )
+            if kwargs['update_fields']:
+                super().save(*args, **kwargs)
 
 class Student(models.Model):
     GENDER_CHOICES = (
@@ -30,6 +60,7 @@ class Student(models.Model):
     phone_number = models.CharField(max_length=15)
     gender = models.CharField(max_length=1, choices=GENDER_CHOICES)
     room = models.ForeignKey(Room, on_delete=models.SET_NULL, null=True, blank=True)
+    room_preference = models.CharField(max_length=1, choices=Room.ROOM_TYPES, blank=True)
     
     def __str__(self):
         return f"{self.user.first_name} {self.user.last_name} ({self.roll_number})"
@@ -38,6 +69,7 @@ class Announcement(models.Model):
     title = models.CharField(max_length=200)
     content = models.TextField()
     date_posted = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     posted_by = models.ForeignKey(User, on_delete=models.CASCADE)
     
     def __str__(self):
@@ -50,9 +82,143 @@ class Attendance(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     date = models.DateField(default=timezone.now)
     is_present = models.BooleanField(default=False)
+    # When the mark was taken; offline sync keeps the most recent mark per student and day
+    recorded_at = models.DateTimeField(default=timezone.now, editable=False)
     
     def __str__(self):
         return f"{self.student.user.first_name} - {self.date} - {'Present' if self.is_present else 'Absent'}"
     
     class Meta:
         unique_together = ['student', 'date']
+        indexes = [
+            # Keyset pagination on (date, id) and its present/absent filter.
+            models.Index(fields=['date', 'id'], name='attendance_date_id_idx'),
+            models.Index(fields=['is_present', 'date', 'id'], name='attendance_present_date_idx'),
+        ]
+
+class AttendanceDailySummary(models.Model):
+    """Present/recorded counts per room and day, maintained from Attendance.
+
+    Students are counted under the room they currently occupy, so moving a
+    student moves their past days to the new room's summaries; room is null
+    for students without a room.
+    """
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, null=True, blank=True)
+    date = models.DateField()
+    present = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.room or 'Unassigned'} - {self.date} - {self.present}/{self.total}"
+    
+    class Meta:
+        unique_together = ['room', 'date']
+        constraints = [
+            # NULLs never collide in unique_together, so the unassigned rows need their own
+            models.UniqueConstraint(
+                fields=['date'], condition=models.Q(room__isnull=True), name='daily_summary_unassigned_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='daily_summary_date_idx'),
+        ]
+
+class StudentMonthlyAttendance(models.Model):
+    """Present/recorded day counts per student and calendar month"""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    month = models.DateField(help_text='First day of the month')
+    present_days = models.PositiveIntegerField(default=0)
+    recorded_days = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.student.roll_number} - {self.month:%b %Y} - {self.present_days}/{self.recorded_days}"
+    
+    class Meta:
+        unique_together = ['student', 'month']
+        indexes = [
+            models.Index(fields=['month'], name='monthly_attendance_month_idx'),
+        ]
+
+class AttendanceBitmap(models.Model):
+    """One month of a student's attendance packed into two bitsets.
+
+    Bit ``day - 1`` of ``recorded_mask`` is set when attendance was taken
+    that day and the same bit of ``present_mask`` when the student was
+    present, so a month costs one row instead of up to 31.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    month = models.DateField(help_text='First day of the month')
+    present_mask = models.PositiveIntegerField(default=0)
+    recorded_mask = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.student.roll_number} - {self.month:%b %Y} - {self.present_days}/{self.recorded_days}"
+    
+    @property
+    def present_days(self):
+        return self.present_mask.bit_count()
+    
+    @property
+    def recorded_days(self):
+        return self.recorded_mask.bit_count()
+    
+    def is_present(self, date):
+        """Return True/False for ``date`` in this month, or None if no attendance was taken"""
+        bit = 1 << (date.day - 1)
+        if not self.recorded_mask & bit:
+            return None
+        return bool(self.present_mask & bit)
+    
+    class Meta:
+        unique_together = ['student', 'month']
+        indexes = [
+            models.Index(fields=['month'], name='attendance_bitmap_month_idx'),
+        ]
+
+class AbsenteeFlag(models.Model):
+    """A student flagged by the last absentee detection run"""
+    student = models.OneToOneField(Student, on_delete=models.CASCADE)
+    detected_on = models.DateField()
+    absence_streak = models.PositiveIntegerField(help_text='Consecutive recorded absences up to detected_on')
+    recent_rate = models.FloatField(null=True, blank=True, help_text='Attendance % over the last week')
+    baseline_rate = models.FloatField(null=True, blank=True, help_text='Attendance % over the four weeks before')
+    
+    def __str__(self):
+        return f"{self.student.roll_number} - {self.detected_on}"
+    
+    @property
+    def rate_drop(self):
+        if self.recent_rate is None or self.baseline_rate is None:
+            return None
+        return self.baseline_rate - self.recent_rate
+    
+    class Meta:
+        ordering = ['-absence_streak', 'recent_rate']
+
+class IdempotencyKey(models.Model):
+    """Stored response of an API write, replayed when a client retries with the same key"""
+    key = models.CharField(max_length=255, unique=True)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField()
+    response = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    def __str__(self):
+        return self.key
+
+def _generation_token():
+    return uuid.uuid4().hex[:8]
+
+class Generation(models.Model):
+    """Write counter behind hostel.stats.generation() and roster_version().
+
+    Kept in the database so every worker reads the same stamp. The token is
+    new whenever the row is (re)created, so a counter that starts over
+    never repeats a stamp that still names cached fragments.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    token = models.CharField(max_length=8, default=_generation_token, editable=False)
+    value = models.PositiveBigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.name} - {self.token}.{self.value}"
@@ -0,0 +1,49 @@
+import datetime
+
+from django.db.models import Q
+
+
+def encode_cursor(record):
+    return f'{record.date.isoformat()}_{record.pk}'
+
+
+def decode_cursor(cursor):
+    """Turn a ``YYYY-MM-DD_id`` cursor back into a ``(date, id)`` pair, or None"""
+    try:
+        date, pk = cursor.split('_', 1)
+        return datetime.date.fromisoformat(date), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+def keyset_page(queryset, after=None, before=None, page_size=50):
+    """Return one page of a queryset ordered newest first on ``(date, id)``.
+
+    Pages are addressed by the cursor of the last (``after``) or first
+    (``before``) row of a neighbouring page, so the database seeks straight
+    to the page through the ``(date, id)`` index instead of counting past
+    an OFFSET. Returns ``(records, next_cursor, prev_cursor)``.
+    """
+    after = decode_cursor(after) if after else None
+    before = decode_cursor(before) if before else None
+
+    if before:
+        date, pk = before
+        rows = list(
+            queryset.filter(Q(date__gt=date) | Q(date=date, pk__gt=pk))
+            .order_by('date', 'pk')[:page_size + 1]
+        )
+        has_more = len(rows) > page_size
+        records = rows[:page_size][::-1]
+        has_next, has_prev = True, has_more
+    else:
+        if after:
+            date, pk = after
+            queryset = queryset.filter(Q(date__lt=date) | Q(date=date, pk__lt=pk))
+        rows = list(queryset.order_by('-date', '-pk')[:page_size + 1])
+        records = rows[:page_size]
+        has_next, has_prev = len(rows) > page_size, after is not None
+
+    next_cursor = encode_cursor(records[-1]) if records and has_next else None
+    prev_cursor = encode_cursor(records[0]) if records and has_prev else None
+    return records, next_cursor, prev_cursor
@@ -0,0 +1,182 @@
+import datetime
+import threading
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+
+from .models import Attendance, AttendanceDailySummary, Room, Student, StudentMonthlyAttendance
+
+BATCH_SIZE = 2000
+
+# Summary keys waiting for the current transaction to commit, per thread like the connections
+_pending = threading.local()
+
+
+def _month_bounds(date):
+    start = date.replace(day=1)
+    end = (start + datetime.timedelta(days=32)).replace(day=1) - datetime.timedelta(days=1)
+    return start, end
+
+
+def refresh_daily(keys):
+    """Recompute the summaries for the given ``(room id, date)`` pairs; a room id of None means unassigned.
+
+    The summary rows are created empty and locked before anything is
+    counted, so a concurrent refresh of the same room waits and then counts
+    the marks this one committed as well.
+    """
+    keys = set(keys)
+    # Summaries of rooms deleted in the meantime went with them
+    live = set(Room.objects.filter(pk__in={room_id for room_id, _ in keys}).values_list('pk', flat=True))
+    keys = sorted(
+        ((room_id, date) for room_id, date in keys if room_id is None or room_id in live),
+        key=lambda key: (key[0] is not None, key[0] or 0, key[1]),
+    )
+    if not keys:
+        return
+    room_ids = {room_id for room_id, _ in keys if room_id is not None}
+    dates = {date for _, date in keys}
+    rooms = Q(student__room__in=room_ids)
+    summaries = AttendanceDailySummary.objects.filter(date__in=dates, room__in=room_ids)
+    if any(room_id is None for room_id, _ in keys):
+        rooms |= Q(student__room__isnull=True)
+        summaries |= AttendanceDailySummary.objects.filter(date__in=dates, room__isnull=True)
+
+    with transaction.atomic():
+        AttendanceDailySummary.objects.bulk_create(
+            [AttendanceDailySummary(room_id=room_id, date=date) for room_id, date in keys],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        locked = list(summaries.select_for_update().order_by('pk'))
+        counts = {
+            (row['student__room'], row['date']): (row['present'], row['total'])
+            for row in Attendance.objects.filter(rooms, date__in=dates).values('student__room', 'date')
+            .annotate(present=Count('id', filter=Q(is_present=True)), total=Count('id')).order_by()
+        }
+        AttendanceDailySummary.objects.bulk_create(
+            [
+                AttendanceDailySummary(room_id=room_id, date=date, present=present, total=total)
+                for room_id, date in keys if room_id is not None
+                for present, total in [counts.get((room_id, date), (0, 0))]
+            ],
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['room', 'date'],
+            update_fields=['present', 'total'],
+        )
+        # ON CONFLICT cannot name the partial unique index on the unassigned
+        # rows, but they were created and locked above, so update them in place
+        unassigned = [summary for summary in locked if summary.room_id is None]
+        for summary in unassigned:
+            summary.present, summary.total = counts.get((None, summary.date), (0, 0))
+        AttendanceDailySummary.objects.bulk_update(unassigned, ['present', 'total'], batch_size=BATCH_SIZE)
+        summaries.filter(total=0).delete()
+
+
+def refresh_daily_on_commit(keys):
+    """Queue refresh_daily() for ``keys``; everything queued in a transaction is refreshed at once after it commits"""
+    pending = _pending.__dict__.setdefault('keys', set())
+    pending.update(keys)
+    # Every call registers a callback, so a rolled back transaction cannot
+    # strand its keys; the first callback to run takes them all
+    transaction.on_commit(lambda: refresh_daily(_pending.__dict__.pop('keys', ())))
+
+
+def refresh_moved_on_commit(student_id, room_ids):
+    """Queue the summaries of every day ``student_id`` has attendance for, in each of ``room_ids``.
+
+    Attendance counts toward the student's current room, so a move takes
+    their whole history out of the old room's summaries and into the new one's.
+    """
+    dates = list(Attendance.objects.filter(student_id=student_id).values_list('date', flat=True))
+    refresh_daily_on_commit((room_id, date) for room_id in set(room_ids) for date in dates)
+
+
+def refresh_monthly(month, student_ids):
+    """Recompute the monthly rollup of ``month`` for the given students, locking like refresh_daily()"""
+    start, end = _month_bounds(month)
+    # Students deleted since the marks were written have lost their rollups already
+    student_ids = sorted(Student.objects.filter(pk__in=student_ids).values_list('pk', flat=True))
+    rollups = StudentMonthlyAttendance.objects.filter(student_id__in=student_ids, month=start)
+
+    with transaction.atomic():
+        StudentMonthlyAttendance.objects.bulk_create(
+            [StudentMonthlyAttendance(student_id=student_id, month=start) for student_id in student_ids],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        list(rollups.select_for_update().order_by('pk').values_list('pk', flat=True))
+        counts = {
+            row['student']: (row['present'], row['total'])
+            for row in Attendance.objects.filter(student_id__in=student_ids, date__range=(start, end))
+            .values('student').annotate(present=Count('id', filter=Q(is_present=True)), total=Count('id')).order_by()
+        }
+        StudentMonthlyAttendance.objects.bulk_create(
+            [
+                StudentMonthlyAttendance(student_id=student_id, month=start, present_days=present, recorded_days=total)
+                for student_id in student_ids
+                for present, total in [counts.get(student_id, (0, 0))]
+            ],
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['student', 'month'],
+            update_fields=['present_days', 'recorded_days'],
+        )
+        rollups.filter(recorded_days=0).delete()
+
+
+def refresh(date, student_ids):
+    """Bring both rollups up to date after attendance for ``date`` was written or deleted"""
+    refresh_daily((room_id, date) for room_id in Student.objects.filter(pk__in=student_ids).values_list('room_id', flat=True))
+    refresh_monthly(date, student_ids)
+
+
+def rebuild(since=None):
+    """Rebuild both rollups from the raw Attendance history"""
+    attendance = Attendance.objects.all()
+    if since:
+        since = since.replace(day=1)
+        attendance = attendance.filter(date__gte=since)
+    counts = {'present': Count('id', filter=Q(is_present=True)), 'total': Count('id')}
+
+    with transaction.atomic():
+        daily = AttendanceDailySummary.objects.all()
+        monthly = StudentMonthlyAttendance.objects.all()
+        if since:
+            daily = daily.filter(date__gte=since)
+            monthly = monthly.filter(month__gte=since)
+        daily.delete()
+        monthly.delete()
+
+        rows = attendance.values('date', 'student__room').annotate(**counts).order_by().iterator(chunk_size=BATCH_SIZE)
+        days = _bulk_insert(AttendanceDailySummary, (
+            AttendanceDailySummary(
+                room_id=row['student__room'], date=row['date'], present=row['present'], total=row['total']
+            )
+            for row in rows
+        ))
+        rows = (
+            attendance.annotate(month=TruncMonth('date')).values('student', 'month')
+            .annotate(**counts).order_by().iterator(chunk_size=BATCH_SIZE)
+        )
+        months = _bulk_insert(StudentMonthlyAttendance, (
+            StudentMonthlyAttendance(
+                student_id=row['student'], month=row['month'], present_days=row['present'], recorded_days=row['total']
+            )
+            for row in rows
+        ))
+    return days, months
+
+
+def _bulk_insert(model, objs):
+    batch, total = [], 0
+    for obj in objs:
+        batch.append(obj)
+        if len(batch) >= BATCH_SIZE:
+            model.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+    model.objects.bulk_create(batch)
+    return total + len(batch)
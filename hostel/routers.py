@@ -0,0 +1,62 @@
+import contextlib
+import contextvars
+import random
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Cookie marking a browser that wrote recently; its reads stay on the primary
+STICKY_COOKIE = 'hostel_read_primary'
+
+# Database alias reads go to in the current context; None means the primary
+_read_alias = contextvars.ContextVar('hostel_read_alias', default=None)
+
+
+def replicas():
+    return getattr(settings, 'HOSTEL_DATABASE_REPLICAS', [])
+
+
+@contextlib.contextmanager
+def replica_reads():
+    """Send the block's reads to one replica, picked at random, when any are configured"""
+    aliases = replicas()
+    token = _read_alias.set(random.choice(aliases) if aliases else None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+@contextlib.contextmanager
+def primary():
+    """Send the block's reads to the primary, e.g. to read a write made earlier in a GET request"""
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def from_primary(queryset):
+    """``queryset`` pinned to the primary, for rows cached under a version that moves on commit"""
+    return queryset.using(DEFAULT_DB_ALIAS)
+
+
+class ReplicaRouter:
+    """Route reads to a replica inside replica_reads() and everything else to the primary.
+
+    Reads default to the primary, so management commands and background
+    work see their own writes; ReplicaRoutingMiddleware opts read-only
+    requests in. Replicas are copies of ``default`` and are never migrated.
+    """
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -0,0 +1,140 @@
+import re
+
+from django.core.paginator import Paginator
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Announcement
+
+PAGE_SIZE = 20
+# Longer queries are cut down to this many words
+MAX_TERMS = 12
+
+# Per database: SQL selecting matching ids, and SQL selecting (id, rank) best first.
+# The index itself is created by migration 0011_announcement_search.
+MATCH_SQL = {
+    'postgresql': (
+        "SELECT id FROM hostel_announcement "
+        "WHERE search_vector @@ websearch_to_tsquery('pg_catalog.english', %s)"
+    ),
+    'sqlite': 'SELECT rowid FROM hostel_announcement_fts WHERE hostel_announcement_fts MATCH %s',
+}
+RANKED_SQL = {
+    'postgresql': (
+        "SELECT id, ts_rank(search_vector, query) AS rank "
+        "FROM hostel_announcement, websearch_to_tsquery('pg_catalog.english', %s) query "
+        "WHERE search_vector @@ query ORDER BY rank DESC, id DESC LIMIT %s OFFSET %s"
+    ),
+    # bm25() is lower for better matches; title hits weigh ten times content hits
+    'sqlite': (
+        "SELECT rowid, -bm25(hostel_announcement_fts, 10.0, 1.0) AS rank "
+        "FROM hostel_announcement_fts WHERE hostel_announcement_fts MATCH %s "
+        "ORDER BY rank DESC, rowid DESC LIMIT %s OFFSET %s"
+    ),
+}
+
+
+def _terms(query):
+    return re.findall(r'\w+', query)[:MAX_TERMS]
+
+
+def _substring_match(terms):
+    """Fallback for databases without an index: every word in the title or the content"""
+    matches = Q()
+    for term in terms:
+        matches &= Q(title__icontains=term) | Q(content__icontains=term)
+    return matches
+
+
+def _vendor(db):
+    return connections[db].vendor
+
+
+def _index_query(query, vendor):
+    """The query in the syntax of ``vendor``'s index, or None when it has no words"""
+    terms = _terms(query)
+    if not terms:
+        return None
+    if vendor == 'sqlite':
+        # Quoted so FTS5 operators typed by users are taken as words; all words must match
+        return ' '.join(f'"{term}"' for term in terms)
+    return ' '.join(terms)
+
+
+class AnnouncementSearch:
+    """Ranked announcement matches, sliceable and countable so Paginator can page through them.
+
+    Slices are read from the full-text index best match first, then the
+    announcements on that page are loaded by id; each gets a ``search_rank``.
+    All of it reads from the database picked for Announcement when created.
+    """
+    def __init__(self, query):
+        self.db = router.db_for_read(Announcement)
+        self.vendor = _vendor(self.db)
+        self.query = _index_query(query, self.vendor)
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            if self.query is None:
+                self._count = 0
+            else:
+                with connections[self.db].cursor() as cursor:
+                    cursor.execute(f'SELECT count(*) FROM ({MATCH_SQL[self.vendor]}) matches', [self.query])
+                    self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step:
+            raise TypeError('AnnouncementSearch only supports slicing')
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+        if self.query is None or stop <= start:
+            return []
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(RANKED_SQL[self.vendor], [self.query, stop - start, start])
+            ranked = cursor.fetchall()
+        announcements = Announcement.objects.using(self.db).select_related('posted_by').in_bulk([pk for pk, _ in ranked])
+        results = []
+        for pk, rank in ranked:
+            if pk in announcements:
+                announcements[pk].search_rank = rank
+                results.append(announcements[pk])
+        return results
+
+
+def search_announcements(query):
+    """Announcements matching ``query``, best first, as something Paginator accepts.
+
+    Databases without a full-text index get an unranked substring match,
+    newest first.
+    """
+    if _vendor(router.db_for_read(Announcement)) in RANKED_SQL:
+        return AnnouncementSearch(query)
+    terms = _terms(query)
+    if not terms:
+        return Announcement.objects.none()
+    return Announcement.objects.filter(_substring_match(terms)).select_related('posted_by').order_by('-date_posted', '-pk')
+
+
+def filter_announcements(queryset, query):
+    """Restrict an Announcement queryset to matches for ``query``, keeping its ordering"""
+    vendor = _vendor(queryset.db)
+    if vendor not in MATCH_SQL:
+        terms = _terms(query)
+        return queryset.filter(_substring_match(terms)) if terms else queryset.none()
+    index_query = _index_query(query, vendor)
+    if index_query is None:
+        return queryset.none()
+    return queryset.filter(pk__in=RawSQL(MATCH_SQL[vendor], [index_query]))
+
+
+def search_page(query, number):
+    """One page of search results, loaded, for the announcements page"""
+    page = Paginator(search_announcements(query), PAGE_SIZE).get_page(number)
+    page.object_list = list(page.object_list)
+    return page
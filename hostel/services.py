@@ -0,0 +1,232 @@
+import random
+import time
+
+from django.db import connection, transaction, OperationalError
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Student, Room, Attendance
+from . import bitmaps, events, rollups, stats
+
+# Lock timeouts, deadlocks and SQLite's "database is locked" are retried this many times
+ASSIGNMENT_RETRIES = 5
+
+
+class RoomUnavailable(Exception):
+    """Raised when a room (or any room) has no free bed left"""
+
+
+def mark_attendance_bulk(date, presence, recorded_at=None):
+    """Upsert a whole day's roll call in a constant number of statements.
+
+    ``presence`` maps student ids to a present/absent boolean and the
+    optional ``recorded_at`` maps them to when each mark was taken (default
+    now). Returns a ``(created, updated)`` tuple of row counts.
+    """
+    if not presence:
+        return 0, 0
+    now = timezone.now()
+    recorded_at = recorded_at or {}
+
+    with transaction.atomic():
+        existing = set(
+            Attendance.objects.filter(date=date, student_id__in=presence.keys())
+            .values_list('student_id', flat=True)
+        )
+        rows = [
+            Attendance(
+                student_id=student_id, date=date, is_present=is_present,
+                recorded_at=recorded_at.get(student_id, now),
+            )
+            for student_id, is_present in presence.items()
+        ]
+
+        if connection.features.supports_update_conflicts_with_target:
+            Attendance.objects.bulk_create(
+                rows,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['student', 'date'],
+                update_fields=['is_present', 'recorded_at'],
+            )
+        else:
+            # Backends without ON CONFLICT (e.g. Oracle): insert the new rows
+            # and flip the existing ones with one UPDATE per present/absent value.
+            Attendance.objects.bulk_create(
+                [row for row in rows if row.student_id not in existing],
+                batch_size=1000,
+            )
+            for is_present in (True, False):
+                ids = [
+                    student_id for student_id, value in presence.items()
+                    if bool(value) == is_present and student_id in existing
+                ]
+                if ids:
+                    Attendance.objects.filter(date=date, student_id__in=ids).update(
+                        is_present=is_present, recorded_at=now,
+                    )
+            # Marks carrying their own timestamp are rare (offline sync); set those row by row
+            for student_id, timestamp in recorded_at.items():
+                if student_id in existing:
+                    Attendance.objects.filter(date=date, student_id=student_id).update(recorded_at=timestamp)
+
+    # bulk_create and update() bypass the model signals. Like theirs, these
+    # updates wait for the commit, so an enclosing transaction that rolls
+    # back (e.g. a lost Idempotency-Key race) leaves no trace.
+    transaction.on_commit(lambda: stats.invalidate('recent_attendance'))
+    transaction.on_commit(lambda: rollups.refresh(date, list(presence)))
+    if bitmaps.enabled():
+        transaction.on_commit(lambda: bitmaps.record(date, presence))
+    return len(rows) - len(existing), len(existing)
+
+
+def delete_attendance(queryset):
+    """Delete the attendance rows in ``queryset`` and update what is derived from them set-wise"""
+    rows = list(queryset.values_list('student_id', 'student__room', 'date'))
+    queryset.delete()
+    months, days = {}, {}
+    for student_id, _, date in rows:
+        months.setdefault(date.replace(day=1), set()).add(student_id)
+        days.setdefault(date, []).append(student_id)
+    transaction.on_commit(lambda: stats.invalidate('recent_attendance', 'absentees'))
+    rollups.refresh_daily_on_commit((room_id, date) for _, room_id, date in rows)
+    for month, student_ids in months.items():
+        transaction.on_commit(lambda month=month, student_ids=student_ids: rollups.refresh_monthly(month, student_ids))
+    for date, student_ids in days.items():
+        if bitmaps.enabled():
+            transaction.on_commit(lambda date=date, student_ids=student_ids: bitmaps.forget(date, student_ids))
+    return len(rows)
+
+
+def update_room_occupancy(room_ids):
+    """Recount occupants for the given rooms and re-derive their availability.
+
+    Runs as one UPDATE with a correlated COUNT, so it is idempotent and
+    safe to call after any change to ``Student.room``.
+    """
+    room_ids = [room_id for room_id in room_ids if room_id is not None]
+    if not room_ids:
+        return
+    occupants = Coalesce(Subquery(
+        Student.objects.filter(room=OuterRef('pk')).order_by().values('room').annotate(n=Count('pk')).values('n')
+    ), 0)
+    Room.objects.filter(pk__in=room_ids).update(
+        occupant_count=occupants,
+        is_available=Case(When(capacity__gt=occupants, then=Value(True)), default=Value(False)),
+    )
+    events.rooms_changed(room_ids)
+    # update() bypasses the model signals
+    transaction.on_commit(lambda: stats.invalidate('available_rooms'))
+    stats.bump_generation(Room)
+
+
+def occupant_genders(room_ids):
+    """Map each of ``room_ids`` that has occupants to the set of their genders"""
+    genders = {}
+    for room_id, gender in Student.objects.filter(room_id__in=room_ids).values_list('room_id', 'gender').distinct():
+        genders.setdefault(room_id, set()).add(gender)
+    return genders
+
+
+def check_room_gender(genders, gender):
+    """Raise RoomUnavailable unless a room whose occupants have ``genders`` can take a ``gender`` student"""
+    if genders - {gender}:
+        raise RoomUnavailable('The selected room is taken by students of another gender.')
+
+
+def _change_occupancy(room_id, delta):
+    """Move a room's occupant_count by ``delta`` with a conditional UPDATE.
+
+    Taking a bed only succeeds while ``occupant_count < capacity``; the
+    check and the increment are one statement, so two requests can never
+    both take the last bed. Returns whether a row was updated.
+    """
+    rooms = Room.objects.filter(pk=room_id)
+    if delta > 0:
+        rooms = rooms.filter(occupant_count__lt=F('capacity'))
+    return rooms.update(
+        occupant_count=F('occupant_count') + delta,
+        is_available=Case(When(capacity__gt=F('occupant_count') + delta, then=Value(True)), default=Value(False)),
+    ) == 1
+
+
+def _with_retries(func):
+    for attempt in range(ASSIGNMENT_RETRIES):
+        try:
+            with transaction.atomic():
+                return func()
+        except OperationalError:
+            if attempt == ASSIGNMENT_RETRIES - 1:
+                raise
+            # Jittered backoff so the contenders do not retry in lockstep
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+
+
+def _move_student(student_id, room_id):
+    # The student's current room is re-read under a row lock, so concurrent
+    # moves of the same student cannot release a bed twice.
+    old_room_id, gender = Student.objects.select_for_update().values_list('room_id', 'gender').get(pk=student_id)
+    if old_room_id == room_id:
+        return
+    if room_id is not None:
+        # Locking the room first means a concurrent move into it has
+        # committed before its occupants' genders are read
+        list(Room.objects.select_for_update().filter(pk=room_id).values_list('pk', flat=True))
+        check_room_gender(occupant_genders([room_id]).get(room_id, set()), gender)
+        if not _change_occupancy(room_id, 1):
+            raise RoomUnavailable('The selected room is full.')
+    if old_room_id is not None:
+        _change_occupancy(old_room_id, -1)
+    # update() keeps the signal-driven recount out of the hot path
+    Student.objects.filter(pk=student_id).update(room_id=room_id)
+    events.rooms_changed([old_room_id, room_id])
+    rollups.refresh_moved_on_commit(student_id, [old_room_id, room_id])
+    stats.bump_roster_version()
+    stats.bump_generation(Room, Student)
+
+
+def assign_room(student, room):
+    """Atomically move ``student`` into ``room``, releasing their old room.
+
+    A ``room`` of None just releases the old room. Raises RoomUnavailable
+    if the room is full or has occupants of another gender, the same rule
+    allocate_room() applies. Lock conflicts are retried with backoff, with one
+    transaction per attempt.
+    """
+    room_id = room.pk if isinstance(room, Room) else room
+    _with_retries(lambda: _move_student(student.pk, room_id))
+    student.room_id = room_id
+    transaction.on_commit(lambda: stats.invalidate('available_rooms'))
+
+
+def allocate_room(student, room_type=None):
+    """Put ``student`` in any free room, skipping rooms other requests have locked.
+
+    Rooms that are already partly filled are preferred so Double/Triple
+    rooms fill up before new ones are opened, and rooms with occupants of
+    another gender are never offered. Returns the room id.
+    """
+    other_genders = [code for code, _ in Student.GENDER_CHOICES if code != student.gender]
+    candidates = (
+        Room.objects.filter(is_available=True)
+        .exclude(student__gender__in=other_genders)
+        .order_by('-occupant_count', 'pk')
+    )
+    if room_type:
+        candidates = candidates.filter(room_type=room_type)
+
+    def take():
+        # Concurrent requests each lock a different room instead of queueing on one
+        for room_id in candidates.select_for_update(skip_locked=True).values_list('pk', flat=True)[:3]:
+            try:
+                with transaction.atomic():
+                    _move_student(student.pk, room_id)
+                return room_id
+            except RoomUnavailable:
+                continue
+        raise RoomUnavailable('No free room is left.')
+
+    room_id = _with_retries(take)
+    student.room_id = room_id
+    transaction.on_commit(lambda: stats.invalidate('available_rooms'))
+    return room_id
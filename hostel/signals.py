@@ -0,0 +1,105 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import pre_delete, pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from . import bitmaps, events, rollups, stats
+from .services import update_room_occupancy
+from .models import Student, Room, Announcement, Attendance
+
+# Cache updates wait for the commit so a concurrent reader cannot re-cache
+# the pre-write values in between. Generation stamps are database rows and
+# move in the writing transaction instead, so they commit with the rows.
+
+
+@receiver(pre_save, sender=Student)
+def student_saving(sender, instance, update_fields=None, **kwargs):
+    # Remember the previous room so both sides of a move can be recounted
+    if update_fields is not None and 'room' not in update_fields:
+        instance._previous_room_id = instance.room_id
+    elif instance.pk:
+        instance._previous_room_id = (
+            Student.objects.filter(pk=instance.pk).values_list('room_id', flat=True).first()
+        )
+    else:
+        instance._previous_room_id = None
+
+
+@receiver(post_save, sender=Student)
+def student_saved(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: stats.adjust('student_count', 1))
+    previous_room_id = getattr(instance, '_previous_room_id', None)
+    if previous_room_id != instance.room_id:
+        update_room_occupancy([previous_room_id, instance.room_id])
+        if not created:
+            rollups.refresh_moved_on_commit(instance.pk, [previous_room_id, instance.room_id])
+    stats.bump_roster_version()
+    stats.bump_generation(Student)
+
+
+@receiver(pre_delete, sender=Student)
+def student_deleting(sender, instance, **kwargs):
+    # Attendance has no delete signals so the cascade can fast-delete it;
+    # the days it covered are read first and their summaries refreshed
+    # together once the transaction commits. The monthly rollups and
+    # bitmaps cascade with the student.
+    dates = Attendance.objects.filter(student=instance).values_list('date', flat=True)
+    rollups.refresh_daily_on_commit((instance.room_id, date) for date in dates)
+
+
+@receiver(post_delete, sender=Student)
+def student_deleted(sender, instance, **kwargs):
+    update_room_occupancy([instance.room_id])
+    transaction.on_commit(lambda: stats.adjust('student_count', -1))
+    transaction.on_commit(lambda: stats.invalidate('recent_attendance', 'absentees'))
+    stats.bump_roster_version()
+    stats.bump_generation(Student)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login; anything else may rename a student
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        stats.bump_roster_version()
+        stats.bump_generation(User)
+
+
+@receiver([post_save, post_delete], sender=Room)
+def room_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: stats.invalidate('room_count', 'available_rooms'))
+    stats.bump_roster_version()
+    stats.bump_generation(Room)
+
+
+@receiver(post_save, sender=Room)
+def room_saved(sender, instance, **kwargs):
+    # A capacity change can open or close the room
+    events.rooms_changed([instance.pk])
+
+
+@receiver(post_save, sender=Announcement)
+def announcement_saved(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: stats.adjust('announcement_count', 1))
+        events.announcement_posted(instance)
+    transaction.on_commit(lambda: stats.invalidate('announcements', 'announcement_etag', 'announcement_modified'))
+
+
+@receiver(post_delete, sender=Announcement)
+def announcement_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: stats.adjust('announcement_count', -1))
+    transaction.on_commit(stats.record_announcement_deletion)
+
+
+@receiver(post_save, sender=Attendance)
+def attendance_saved(sender, instance, **kwargs):
+    transaction.on_commit(lambda: stats.invalidate('recent_attendance'))
+    transaction.on_commit(lambda: rollups.refresh(instance.date, [instance.student_id]))
+    if bitmaps.enabled():
+        transaction.on_commit(lambda: bitmaps.record(instance.date, {instance.student_id: instance.is_present}))
+
+
+# No post_delete receiver for Attendance: it would make every student,
+# user and room delete remove their attendance row by row. Deletes of
+# attendance itself go through services.delete_attendance().
@@ -0,0 +1,162 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Max, Q
+from django.utils import timezone
+
+from . import routers
+from .models import Student, Room, Announcement, Attendance, AbsenteeFlag, Generation
+
+KEY_PREFIX = 'hostel:stats:'
+ROSTER = 'roster'
+ANNOUNCEMENT_DELETED_KEY = 'hostel:announcement_deleted'
+TIMEOUT = getattr(settings, 'HOSTEL_STATS_TIMEOUT', 300)
+
+
+def _room_counts():
+    return Room.objects.aggregate(
+        room_count=Count('id'),
+        available_rooms=Count('id', filter=Q(is_available=True)),
+    )
+
+
+def _announcement_stamp():
+    # Deletions leave no updated_at behind, so the time of the last one is
+    # kept separately; the count still changes the ETag if it was evicted
+    stamp = Announcement.objects.aggregate(count=Count('id'), modified=Max('updated_at'))
+    modified = max(filter(None, [stamp['modified'], cache.get(ANNOUNCEMENT_DELETED_KEY)]), default=None)
+    return {
+        'announcement_etag': f"{stamp['count']}-{modified.timestamp() if modified else 0:.6f}",
+        'announcement_modified': modified,
+    }
+
+
+# Each loader fills one or more stats; stats sharing a loader are computed together.
+LOADERS = {
+    'student_count': lambda: {'student_count': Student.objects.count()},
+    'room_count': _room_counts,
+    'available_rooms': _room_counts,
+    'announcement_count': lambda: {'announcement_count': Announcement.objects.count()},
+    'announcements': lambda: {
+        'announcements': list(Announcement.objects.select_related('posted_by')[:5])
+    },
+    'announcement_etag': _announcement_stamp,
+    'announcement_modified': _announcement_stamp,
+    'recent_attendance': lambda: {
+        'recent_attendance': list(Attendance.objects.select_related('student__user').order_by('-date')[:10])
+    },
+    'absentees': lambda: {
+        'absentees': list(AbsenteeFlag.objects.select_related('student__user', 'student__room')[:10])
+    },
+}
+
+
+def get_stats(*names):
+    """Return a dict of dashboard stats, served from the cache when warm.
+
+    Missing stats are loaded from the primary database: a lagging replica
+    would leave stale values in the cache until they time out.
+    """
+    names = names or tuple(LOADERS)
+    cached = cache.get_many([KEY_PREFIX + name for name in names])
+    stats = {key[len(KEY_PREFIX):]: value for key, value in cached.items()}
+
+    fresh = {}
+    with routers.primary():
+        for name in names:
+            if name not in stats and name not in fresh:
+                fresh.update(LOADERS[name]())
+    if fresh:
+        cache.set_many({KEY_PREFIX + name: value for name, value in fresh.items()}, TIMEOUT)
+        stats.update(fresh)
+    return {name: stats[name] for name in names}
+
+
+async def aget_stats(*names):
+    """get_stats() for async views; loaders for stats missing from the cache are awaited together"""
+    names = names or tuple(LOADERS)
+    cached = await cache.aget_many([KEY_PREFIX + name for name in names])
+    stats = {key[len(KEY_PREFIX):]: value for key, value in cached.items()}
+
+    loaders = list({LOADERS[name]: None for name in names if name not in stats})
+    fresh = {}
+    with routers.primary():
+        results = await asyncio.gather(*(sync_to_async(loader)() for loader in loaders))
+    for result in results:
+        fresh.update(result)
+    if fresh:
+        await cache.aset_many({KEY_PREFIX + name: value for name, value in fresh.items()}, TIMEOUT)
+        stats.update(fresh)
+    return {name: stats[name] for name in names}
+
+
+def invalidate(*names):
+    """Drop cached stats so the next read recomputes them; no names drops everything"""
+    cache.delete_many([KEY_PREFIX + name for name in names or LOADERS])
+
+
+def adjust(name, delta):
+    """Incrementally update a cached counter; a missing one is recomputed on the next read"""
+    try:
+        cache.incr(KEY_PREFIX + name, delta)
+    except ValueError:
+        pass
+
+
+def record_announcement_deletion():
+    """Move the announcements' Last-Modified forward after one is deleted"""
+    cache.set(ANNOUNCEMENT_DELETED_KEY, timezone.now(), None)
+    invalidate('announcements', 'announcement_etag', 'announcement_modified')
+
+
+def _stamps(names):
+    """Map each of ``names`` to its current ``token.value`` stamp, creating missing counters"""
+    counters = routers.from_primary(Generation.objects.filter(name__in=names))
+    stamps = {name: f'{token}.{value}' for name, token, value in counters.values_list('name', 'token', 'value')}
+    missing = set(names) - set(stamps)
+    if missing:
+        Generation.objects.bulk_create([Generation(name=name) for name in missing], ignore_conflicts=True)
+        stamps.update(_stamps(missing))
+    return {name: stamps[name] for name in names}
+
+
+def _bump(names):
+    # A counter that does not exist yet gets a new token when it is created, which moves its stamp too
+    if Generation.objects.filter(name__in=names).update(value=F('value') + 1) < len(set(names)):
+        Generation.objects.bulk_create([Generation(name=name) for name in names], ignore_conflicts=True)
+
+
+def roster_version():
+    """Opaque stamp that changes whenever students, their names or rooms change.
+
+    Offline clients compare it to decide whether to download the roster
+    again. It is read from the database, so every worker gives the same
+    answer without a shared cache.
+    """
+    return _stamps([ROSTER])[ROSTER]
+
+
+def bump_roster_version():
+    _bump([ROSTER])
+
+
+def _generation_name(model):
+    return model._meta.label_lower
+
+
+def generation(*models):
+    """Stamp that changes whenever a row of any of ``models`` is written, for versioned cache keys.
+
+    Stamps are counters in the database, so every worker reads the same
+    one and a fragment cached by one worker is served by all of them until
+    the next write; fragments keyed on it are cached for TIMEOUT.
+    """
+    names = [_generation_name(model) for model in models]
+    stamps = _stamps(names)
+    return '-'.join(stamps[name] for name in names)
+
+
+def bump_generation(*models):
+    _bump([_generation_name(model) for model in models])
@@ -0,0 +1,81 @@
+import datetime
+
+import numpy as np
+
+from . import bitmaps
+
+DAY_OFFSETS = np.arange(31)
+
+
+def _runs(hits, recorded):
+    """Length of the run of ``hits`` ending on each day.
+
+    Days without attendance neither extend nor break a run, so a weekend
+    between two absences still counts as one absence streak.
+    """
+    days = np.arange(hits.shape[1])
+    counted = np.cumsum(hits, axis=1)
+    last_break = np.maximum.accumulate(np.where(recorded & ~hits, days, -1), axis=1)
+    before = np.take_along_axis(counted, np.maximum(last_break, 0), axis=1)
+    return counted - np.where(last_break >= 0, before, 0)
+
+
+class AttendanceMatrix:
+    """Students x days boolean matrices unpacked from monthly attendance bitmasks"""
+    def __init__(self, student_ids, dates, present, recorded):
+        self.student_ids = student_ids
+        self.dates = dates
+        self.present = present
+        self.recorded = recorded
+
+    @classmethod
+    def load(cls, start, end, student_ids=None):
+        """Read every month overlapping ``start``..``end`` (inclusive) with one query"""
+        rows = bitmaps.masks(start, end, student_ids)
+        student_ids, months, present_masks, recorded_masks = zip(*rows) if rows else ((), (), (), ())
+
+        dates = np.arange(np.datetime64(start, 'D'), np.datetime64(end + datetime.timedelta(days=1), 'D'))
+        ids, row_index = np.unique(np.array(student_ids, dtype=np.int64), return_inverse=True)
+        present = np.zeros((len(ids), len(dates)), dtype=bool)
+        recorded = np.zeros_like(present)
+
+        offsets = {month: (month - start).days for month in set(months)}
+        columns = np.array([offsets[month] for month in months], dtype=np.int64).reshape(-1, 1) + DAY_OFFSETS
+        in_range = (columns >= 0) & (columns < len(dates))
+        for target, masks in ((present, present_masks), (recorded, recorded_masks)):
+            masks = np.array(masks, dtype=np.int64).reshape(-1, 1)
+            student, day = np.nonzero(((masks >> DAY_OFFSETS) & 1).astype(bool) & in_range)
+            target[row_index[student], columns[student, day]] = True
+        return cls(ids, dates, present, recorded)
+
+    def rates(self, days=slice(None)):
+        """Percentage of recorded days present per student (NaN when nothing was recorded).
+
+        ``days`` is a slice of the day axis, e.g. ``slice(-7, None)`` for the last week.
+        """
+        recorded = self.recorded[:, days].sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.present[:, days].sum(axis=1) * 100.0 / recorded
+
+    def absence_runs(self):
+        return _runs(self.recorded & ~self.present, self.recorded)
+
+    def presence_runs(self):
+        return _runs(self.present, self.recorded)
+
+    def longest_presence_streaks(self):
+        return self.presence_runs().max(axis=1, initial=0)
+
+    def longest_absence_streaks(self):
+        return self.absence_runs().max(axis=1, initial=0)
+
+    def current_absence_streaks(self):
+        """Consecutive recorded absences up to the last day of the window"""
+        runs = self.absence_runs()
+        return runs[:, -1] if runs.shape[1] else np.zeros(len(self.student_ids), dtype=np.int64)
+
+    def absence_alerts(self, days):
+        """Map student id to the length of an ongoing absence streak of at least ``days``"""
+        current = self.current_absence_streaks()
+        flagged = np.nonzero(current >= days)[0]
+        return dict(zip(self.student_ids[flagged].tolist(), current[flagged].tolist()))
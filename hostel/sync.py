@@ -0,0 +1,115 @@
+import datetime
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import routers, stats
+from .models import Student, Room, Attendance
+from .services import mark_attendance_bulk
+
+ROOM_COLUMNS = ('id', 'room_number', 'block')
+STUDENT_COLUMNS = ('id', 'roll_number', 'user__first_name', 'user__last_name', 'room_id')
+
+
+def roster_snapshot():
+    """The roster as column lists plus rows of values, with the version it was read at.
+
+    Read from the primary: clients keep the snapshot until the version
+    changes, so one taken from a lagging replica would stick.
+    """
+    version = stats.roster_version()
+    with routers.primary():
+        rooms = list(Room.objects.order_by('pk').values_list(*ROOM_COLUMNS))
+        students = list(Student.objects.order_by('pk').values_list(*STUDENT_COLUMNS))
+    return {
+        'version': version,
+        'rooms': {'columns': ROOM_COLUMNS, 'rows': rooms},
+        'students': {
+            'columns': ('id', 'roll_number', 'first_name', 'last_name', 'room_id'),
+            'rows': students,
+        },
+    }
+
+
+class SyncError(Exception):
+    """Raised for an upload that cannot be parsed"""
+
+
+def parse_recorded_at(value, now):
+    """Parse the ISO timestamp of when a mark was taken; raises TypeError or ValueError if it is not one.
+
+    Timestamps without a zone are taken in the server's zone, and ones in
+    the future are clamped to ``now`` so a device with a fast clock cannot
+    pin a mark forever.
+    """
+    recorded_at = parse_datetime(value)
+    if recorded_at is None:
+        raise ValueError
+    if timezone.is_naive(recorded_at):
+        recorded_at = timezone.make_aware(recorded_at)
+    return min(recorded_at, now)
+
+
+def parse_changes(changes):
+    """Parse ``[student_id, date, present, recorded_at]`` rows, keeping the newest per student and day"""
+    now = timezone.now()
+    latest = {}
+    for index, change in enumerate(changes):
+        try:
+            student_id, date, present, recorded_at = change
+            if not isinstance(student_id, int) or not isinstance(present, bool):
+                raise TypeError
+            recorded_at = parse_recorded_at(recorded_at, now)
+            date = datetime.date.fromisoformat(date)
+        except (TypeError, ValueError):
+            raise SyncError(f'Change {index} must be [student_id, "YYYY-MM-DD", present, "ISO timestamp"].')
+        key = (student_id, date)
+        if key not in latest or latest[key][1] < recorded_at:
+            latest[key] = (present, recorded_at)
+    return latest
+
+
+def merge_changes(changes):
+    """Merge an offline upload into Attendance; the most recently taken mark wins.
+
+    Marks older than (or as old as) the one already stored are returned as
+    conflicts carrying the server's value, so the client can adopt it.
+    Students deleted since the client's roster download are reported as
+    unknown. Accepted marks are written with one upsert per day.
+    """
+    latest = parse_changes(changes)
+    student_ids = {student_id for student_id, _ in latest}
+    dates = {date for _, date in latest}
+
+    with transaction.atomic():
+        known = set(Student.objects.filter(pk__in=student_ids).values_list('pk', flat=True))
+        stored = {
+            (student_id, date): (is_present, recorded_at)
+            for student_id, date, is_present, recorded_at in (
+                Attendance.objects.select_for_update()
+                .filter(student_id__in=known, date__in=dates)
+                .values_list('student_id', 'date', 'is_present', 'recorded_at')
+            )
+        }
+
+        by_date, conflicts, unknown = {}, [], set()
+        for (student_id, date), (present, recorded_at) in latest.items():
+            if student_id not in known:
+                unknown.add(student_id)
+                continue
+            server = stored.get((student_id, date))
+            if server and server[1] >= recorded_at:
+                if server[0] != present:
+                    conflicts.append([student_id, date.isoformat(), server[0], server[1].isoformat()])
+                continue
+            presence, timestamps = by_date.setdefault(date, ({}, {}))
+            presence[student_id] = present
+            timestamps[student_id] = recorded_at
+
+        applied = 0
+        for date, (presence, timestamps) in sorted(by_date.items()):
+            mark_attendance_bulk(date, presence, recorded_at=timestamps)
+            applied += len(presence)
+
+    return {'applied': applied, 'conflicts': conflicts, 'unknown_students': sorted(unknown)}
@@ -1,3 +1,800 @@
-from django.test import TestCase
+import datetime
+import json
+import math
+import pkgutil
+import threading
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import load_command_class
+from django.db import IntegrityError, OperationalError, connection
+from django.db.models import Count
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from . import absentees, bitmaps, rollups, routers, search, stats, typeahead
+from .datagen import generate
+from .importer import import_students
+from .middleware import ReplicaRoutingMiddleware
+from .models import (
+    AbsenteeFlag, Announcement, Attendance, AttendanceBitmap, AttendanceDailySummary, IdempotencyKey, Room, Student,
+)
+from .pagination import keyset_page
+from .services import RoomUnavailable, allocate_room, assign_room, mark_attendance_bulk
+from .streaks import AttendanceMatrix
+from .sync import merge_changes
+
+
+class RoomAssignmentTests(TransactionTestCase):
+    """The conditional occupancy UPDATE behind assign_room() and allocate_room()"""
+
+    def make_student(self, n, gender='M'):
+        user = User.objects.create(username=f'student{n}')
+        return Student.objects.create(user=user, roll_number=f'R{n}', phone_number='0', gender=gender)
+
+    def assertOccupancy(self, room):
+        room.refresh_from_db()
+        occupants = Student.objects.filter(room=room).count()
+        self.assertEqual(room.occupant_count, occupants)
+        self.assertLessEqual(room.occupant_count, room.capacity)
+        self.assertEqual(room.is_available, occupants < room.capacity)
+
+    def test_full_room_raises(self):
+        room = Room.objects.create(room_number='101', room_type='D', capacity=2)
+        students = [self.make_student(n) for n in range(3)]
+        assign_room(students[0], room)
+        assign_room(students[1], room)
+        with self.assertRaises(RoomUnavailable):
+            assign_room(students[2], room)
+        self.assertIsNone(Student.objects.get(pk=students[2].pk).room_id)
+        self.assertOccupancy(room)
+
+    def test_move_releases_old_room(self):
+        old, new = (Room.objects.create(room_number=n, room_type='S') for n in ('101', '102'))
+        student = self.make_student(1)
+        assign_room(student, old)
+        assign_room(student, new)
+        self.assertOccupancy(old)
+        self.assertOccupancy(new)
+        assign_room(student, None)
+        self.assertOccupancy(new)
+
+    def test_reassigning_same_room_is_a_no_op(self):
+        room = Room.objects.create(room_number='101', room_type='S')
+        student = self.make_student(1)
+        assign_room(student, room)
+        assign_room(student, room)
+        self.assertOccupancy(room)
+
+    def test_other_gender_rejected(self):
+        room = Room.objects.create(room_number='101', room_type='D', capacity=2)
+        assign_room(self.make_student(1, 'M'), room)
+        with self.assertRaises(RoomUnavailable):
+            assign_room(self.make_student(2, 'F'), room)
+        self.assertOccupancy(room)
+
+    def test_allocate_skips_full_and_other_gender_rooms(self):
+        full = Room.objects.create(room_number='101', room_type='S')
+        taken = Room.objects.create(room_number='102', room_type='D', capacity=2)
+        free = Room.objects.create(room_number='103', room_type='D', capacity=2)
+        assign_room(self.make_student(1, 'M'), full)
+        assign_room(self.make_student(2, 'F'), taken)
+        self.assertEqual(allocate_room(self.make_student(3, 'M')), free.pk)
+        with self.assertRaises(RoomUnavailable):
+            allocate_room(self.make_student(4, 'M'), room_type='S')
+
+    def test_concurrent_assignments_never_overallocate(self):
+        room = Room.objects.create(room_number='101', room_type='T', capacity=3)
+        students = [self.make_student(n) for n in range(8)]
+        barrier = threading.Barrier(len(students))
+        assigned, full, locked = [], [], []
+
+        def assign(student):
+            try:
+                barrier.wait()
+                assign_room(student, room)
+                assigned.append(student.pk)
+            except RoomUnavailable:
+                full.append(student.pk)
+            except OperationalError:
+                # SQLite can still be locked once the retries run out
+                locked.append(student.pk)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=assign, args=(student,)) for student in students]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(assigned) + len(full) + len(locked), len(students))
+        # A lock timeout is not over-allocation, but most threads must get an answer
+        self.assertLessEqual(len(locked), 2)
+        self.assertGreaterEqual(len(assigned), 1)
+        self.assertLessEqual(len(assigned), room.capacity)
+        # With 8 threads and at most 2 timeouts the room must have filled up
+        self.assertEqual(len(assigned), room.capacity)
+        self.assertEqual(set(Student.objects.filter(room=room).values_list('pk', flat=True)), set(assigned))
+        room.refresh_from_db()
+        self.assertEqual(room.occupant_count, len(assigned))
+        self.assertOccupancy(room)
+
+    def test_sequential_assignments_never_overallocate(self):
+        room = Room.objects.create(room_number='101', room_type='T', capacity=3)
+        for n in range(5):
+            try:
+                assign_room(self.make_student(n), room)
+            except RoomUnavailable:
+                pass
+        self.assertOccupancy(room)
+        self.assertEqual(room.occupant_count, 3)
+
+
+class StudentImportTests(TestCase):
+    def row(self, n, gender='M', room=''):
+        return {
+            'first_name': 'First', 'last_name': 'Last', 'username': f'import{n}', 'email': f'import{n}@example.com',
+            'roll_number': f'IMP{n}', 'phone_number': '0', 'gender': gender, 'room': room,
+        }
+
+    def errors(self, result):
+        return {row_number: messages for row_number, messages in result.errors}
+
+    def test_imports_into_room(self):
+        room = Room.objects.create(room_number='101', room_type='D', capacity=2)
+        result = import_students([self.row(1, room='101'), self.row(2, room='101')])
+        self.assertEqual(result.errors, [])
+        self.assertEqual(len(result.created), 2)
+        room.refresh_from_db()
+        self.assertEqual(room.occupant_count, 2)
+        self.assertFalse(room.is_available)
+
+    def test_full_room_rejected(self):
+        Room.objects.create(room_number='101', room_type='S', capacity=1)
+        result = import_students([self.row(1, room='101'), self.row(2, room='101')], skip_invalid=True)
+        self.assertEqual([row_number for row_number, _, _ in result.created], [2])
+        self.assertIn('room: Room 101 is not available', self.errors(result)[3])
+
+    def test_other_gender_rejected(self):
+        room = Room.objects.create(room_number='101', room_type='T', capacity=3)
+        Student.objects.create(
+            user=User.objects.create(username='resident'), roll_number='R1', phone_number='0', gender='F', room=room,
+        )
+        result = import_students([self.row(1, 'M', '101'), self.row(2, 'F', '101')], skip_invalid=True)
+        self.assertIn('room: The selected room is taken by students of another gender.', self.errors(result)[2])
+        self.assertEqual([row_number for row_number, _, _ in result.created], [3])
+
+    def test_mixed_genders_within_file_rejected(self):
+        Room.objects.create(room_number='101', room_type='D', capacity=2)
+        result = import_students([self.row(1, 'M', '101'), self.row(2, 'F', '101')], skip_invalid=True)
+        self.assertEqual(list(self.errors(result)), [3])
+        self.assertEqual(Student.objects.get(room__room_number='101').gender, 'M')
+
+    def test_duplicates_rejected(self):
+        User.objects.create(username='import1')
+        result = import_students([self.row(1), self.row(2), self.row(2)], skip_invalid=True)
+        errors = self.errors(result)
+        self.assertIn('username: Username already exists', errors[2])
+        self.assertIn('username: Username appears more than once in the file', errors[3])
+        self.assertIn('roll_number: Roll number appears more than once in the file', errors[4])
+        self.assertEqual(result.created, [])
+
+    def test_one_bad_row_writes_nothing(self):
+        Room.objects.create(room_number='101', room_type='S', capacity=1)
+        for rows in ([self.row(1), self.row(1)], [self.row(1, room='101'), self.row(2, room='101')]):
+            with self.subTest(rows=rows):
+                result = import_students(rows)
+                self.assertTrue(result.errors)
+                self.assertEqual(result.created, [])
+                self.assertFalse(Student.objects.exists())
+                self.assertFalse(User.objects.exists())
+
+
+class SyntheticDataTests(TestCase):
+    def test_rooms_are_single_gender_and_never_overfull(self):
+        counts = generate(rooms=12, students=40, announcements=1, days=2, seed=3)
+        self.assertEqual((counts['students'], counts['attendance']), (40, 80))
+        mixed = Student.objects.filter(room__isnull=False).values('room').annotate(
+            genders=Count('gender', distinct=True)).filter(genders__gt=1)
+        self.assertFalse(mixed.exists())
+        for room in Room.objects.all():
+            self.assertEqual(room.occupant_count, Student.objects.filter(room=room).count())
+            self.assertLessEqual(room.occupant_count, room.capacity)
+
+
+@override_settings(HOSTEL_API_TOKENS=['test-token'])
+class AttendanceSyncTests(TestCase):
+    """Offline sync keeps the most recently taken mark per student and day"""
+    date = datetime.date(2020, 2, 29)
+
+    def setUp(self):
+        self.student = Student.objects.create(
+            user=User.objects.create(username='synced'), roll_number='S1', phone_number='0', gender='M',
+        )
+
+    def at(self, hour):
+        return datetime.datetime(2020, 2, 29, hour, tzinfo=datetime.timezone.utc)
+
+    def stored(self):
+        return Attendance.objects.values_list('is_present', 'recorded_at').get(student=self.student, date=self.date)
+
+    def merge(self, present, hour):
+        return merge_changes([[self.student.pk, self.date.isoformat(), present, self.at(hour).isoformat()]])
+
+    def test_newer_mark_wins(self):
+        mark_attendance_bulk(self.date, {self.student.pk: False}, recorded_at={self.student.pk: self.at(9)})
+        result = self.merge(True, 10)
+        self.assertEqual((result['applied'], result['conflicts']), (1, []))
+        self.assertEqual(self.stored(), (True, self.at(10)))
+
+    def test_older_mark_is_a_conflict(self):
+        mark_attendance_bulk(self.date, {self.student.pk: False}, recorded_at={self.student.pk: self.at(10)})
+        result = self.merge(True, 9)
+        self.assertEqual(result['applied'], 0)
+        self.assertEqual(result['conflicts'], [[self.student.pk, '2020-02-29', False, self.at(10).isoformat()]])
+        self.assertEqual(self.stored(), (False, self.at(10)))
+
+    def test_equal_timestamps_keep_the_server_mark(self):
+        mark_attendance_bulk(self.date, {self.student.pk: False}, recorded_at={self.student.pk: self.at(10)})
+        self.assertEqual(len(self.merge(True, 10)['conflicts']), 1)
+        # The same mark uploaded twice is not a conflict
+        self.assertEqual(self.merge(False, 10), {'applied': 0, 'conflicts': [], 'unknown_students': []})
+        self.assertEqual(self.stored(), (False, self.at(10)))
+
+    def test_newest_change_in_one_upload_wins(self):
+        result = merge_changes([
+            [self.student.pk, '2020-02-29', True, self.at(11).isoformat()],
+            [self.student.pk, '2020-02-29', False, self.at(10).isoformat()],
+            [self.student.pk + 1, '2020-02-29', True, self.at(10).isoformat()],
+        ])
+        self.assertEqual(result, {'applied': 1, 'conflicts': [], 'unknown_students': [self.student.pk + 1]})
+        self.assertEqual(self.stored(), (True, self.at(11)))
+
+    def test_future_timestamps_are_clamped(self):
+        merge_changes([[self.student.pk, '2020-02-29', True, '2999-01-01T00:00:00+00:00']])
+        self.assertLessEqual(self.stored()[1], timezone.now())
+
+    def test_api_marks_keep_their_capture_time(self):
+        # A turnstile uploads a 09:00 mark after a tablet took a later one offline
+        response = self.client.post('/api/attendance/', json.dumps({'records': [{
+            'roll_number': 'S1', 'date': '2020-02-29', 'present': False, 'recorded_at': self.at(9).isoformat(),
+        }]}), content_type='application/json', HTTP_AUTHORIZATION='Bearer test-token')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stored(), (False, self.at(9)))
+        self.assertEqual(self.merge(True, 10)['conflicts'], [])
+        self.assertEqual(self.stored(), (True, self.at(10)))
+
+    def test_api_rejects_bad_recorded_at(self):
+        response = self.client.post('/api/attendance/', json.dumps({'records': [{
+            'roll_number': 'S1', 'date': '2020-02-29', 'present': False, 'recorded_at': 'yesterday',
+        }]}), content_type='application/json', HTTP_AUTHORIZATION='Bearer test-token')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Attendance.objects.exists())
+
+
+def make_students(count):
+    users = User.objects.bulk_create(User(username=f'bulk{n}') for n in range(count))
+    if not all(user.pk for user in users):
+        users = User.objects.filter(username__startswith='bulk').order_by('pk')
+    return Student.objects.bulk_create(
+        Student(user=user, roll_number=f'B{n}', phone_number='0', gender='M') for n, user in enumerate(users)
+    )
+
+
+class AttendanceBulkTests(TestCase):
+    date = datetime.date(2020, 3, 2)
+
+    def marks(self):
+        return dict(Attendance.objects.filter(date=self.date).values_list('student_id', 'is_present'))
+
+    def test_re_marking_the_same_day(self):
+        first, second = make_students(2)
+        self.assertEqual(mark_attendance_bulk(self.date, {first.pk: True}), (1, 0))
+        # second has no row yet: one insert and one update in the same call
+        self.assertEqual(mark_attendance_bulk(self.date, {first.pk: False, second.pk: True}), (1, 1))
+        self.assertEqual(self.marks(), {first.pk: False, second.pk: True})
+        self.assertEqual(mark_attendance_bulk(self.date, {first.pk: False, second.pk: True}), (0, 2))
+        self.assertEqual(Attendance.objects.count(), 2)
+
+    def test_form_over_the_upload_field_limit(self):
+        students = make_students(1200)
+        self.client.force_login(User.objects.create(username='warden', is_staff=True))
+        # One field per student is refused by Django before the view runs
+        response = self.client.post('/attendance/bulk/', {
+            'date': '2020-03-02', **{f'student_{student.pk}': 'on' for student in students},
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Attendance.objects.exists())
+        present = {student.pk for student in students[::2]}
+        response = self.client.post('/attendance/bulk/', {
+            'date': '2020-03-02', 'present_ids': ','.join(map(str, present)),
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.marks(), {student.pk: student.pk in present for student in students})
+
+    def test_form_without_javascript(self):
+        first, second = make_students(2)
+        self.client.force_login(User.objects.create(username='warden', is_staff=True))
+        self.client.post('/attendance/bulk/', {'date': '2020-03-02', f'student_{first.pk}': 'on'})
+        self.assertEqual(self.marks(), {first.pk: True, second.pk: False})
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        students = make_students(3)
+        # Seven rows over three dates, so pages break inside a date
+        Attendance.objects.bulk_create(
+            Attendance(student=student, date=datetime.date(2020, 3, day), is_present=True)
+            for day in (1, 2, 3) for student in students[:3 if day != 2 else 1]
+        )
+        self.expected = list(Attendance.objects.order_by('-date', '-pk').values_list('pk', flat=True))
+
+    def walk(self, page_size):
+        pages, after = [], None
+        while True:
+            records, after, before = keyset_page(Attendance.objects.all(), after=after, page_size=page_size)
+            pages.append(([record.pk for record in records], before))
+            if after is None:
+                return pages
+
+    def test_forward_pages_cover_every_row_once(self):
+        for page_size in (1, 2, 3, 7, 10):
+            with self.subTest(page_size=page_size):
+                pages = self.walk(page_size)
+                self.assertEqual([pk for page, _ in pages for pk in page], self.expected)
+                self.assertIsNone(pages[0][1])
+                self.assertTrue(all(before for _, before in pages[1:]))
+                # A page size dividing the rows exactly has no empty last page
+                self.assertTrue(all(page for page, _ in pages))
+
+    def test_backward_page_mirrors_forward(self):
+        first, next_cursor, _ = keyset_page(Attendance.objects.all(), page_size=3)
+        second, _, prev_cursor = keyset_page(Attendance.objects.all(), after=next_cursor, page_size=3)
+        self.assertEqual([record.pk for record in second], self.expected[3:6])
+        back, forward, prev_again = keyset_page(Attendance.objects.all(), before=prev_cursor, page_size=3)
+        self.assertEqual(back, first)
+        self.assertIsNone(prev_again)
+        self.assertEqual(forward, next_cursor)
+
+    def test_bad_cursor_starts_over(self):
+        for cursor in ('junk', '2020-13-01_1', '2020-03-01_x'):
+            with self.subTest(cursor=cursor):
+                records, _, prev_cursor = keyset_page(Attendance.objects.all(), after=cursor, page_size=3)
+                self.assertEqual([record.pk for record in records], self.expected[:3])
+                self.assertIsNone(prev_cursor)
+
+
+class DailySummaryTests(TestCase):
+    """Attendance counts toward the room a student currently occupies"""
+    date = datetime.date(2020, 3, 2)
+
+    def setUp(self):
+        self.old, self.new = (Room.objects.create(room_number=n, room_type='S') for n in ('101', '102'))
+        self.student = Student.objects.create(
+            user=User.objects.create(username='mover'), roll_number='M1', phone_number='0', gender='M',
+        )
+
+    def summaries(self):
+        return set(AttendanceDailySummary.objects.values_list('room__room_number', 'date', 'present', 'total'))
+
+    def mark(self, date, present):
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_attendance_bulk(date, {self.student.pk: present})
+
+    def test_move_and_re_mark_counts_each_day_once(self):
+        later = self.date + datetime.timedelta(days=1)
+        assign_room(self.student, self.old)
+        self.mark(self.date, True)
+        self.assertEqual(self.summaries(), {('101', self.date, 1, 1)})
+        with self.captureOnCommitCallbacks(execute=True):
+            assign_room(self.student, self.new)
+        self.assertEqual(self.summaries(), {('102', self.date, 1, 1)})
+        self.mark(self.date, False)
+        self.mark(later, True)
+        self.assertEqual(self.summaries(), {('102', self.date, 0, 1), ('102', later, 1, 1)})
+
+    def test_move_by_saving_the_student(self):
+        self.student.room = self.old
+        self.student.save()
+        self.mark(self.date, True)
+        self.student.room = None
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.save()
+        self.assertEqual(self.summaries(), {(None, self.date, 1, 1)})
+        self.assertEqual(rollups.rebuild(), (1, 1))
+        self.assertEqual(self.summaries(), {(None, self.date, 1, 1)})
+
+    def test_one_unassigned_row_per_day(self):
+        self.mark(self.date, True)
+        self.mark(self.date, False)
+        rollups.refresh_daily([(None, self.date), (None, self.date)])
+        self.assertEqual(self.summaries(), {(None, self.date, 0, 1)})
+        with self.assertRaises(IntegrityError):
+            AttendanceDailySummary.objects.create(date=self.date)
+
+
+class AttendanceBitmapTests(TestCase):
+    """Month bitmasks and the streaks read from them, with and without stored bitmaps"""
+
+    def setUp(self):
+        self.student = Student.objects.create(
+            user=User.objects.create(username='packed'), roll_number='B1', phone_number='0', gender='M',
+        )
+
+    def mark(self, days):
+        """Store ``{date: is_present}`` without going through the signals"""
+        Attendance.objects.bulk_create(
+            Attendance(student=self.student, date=date, is_present=present) for date, present in days.items()
+        )
+
+    def load(self, start, end):
+        """Load the matrix from raw attendance and from rebuilt bitmaps; both must agree"""
+        with self.settings(HOSTEL_ATTENDANCE_BITMAPS=False):
+            packed = AttendanceMatrix.load(start, end)
+        with self.settings(HOSTEL_ATTENDANCE_BITMAPS=True):
+            bitmaps.rebuild()
+            stored = AttendanceMatrix.load(start, end)
+        for name in ('student_ids', 'dates', 'present', 'recorded'):
+            self.assertEqual(getattr(packed, name).tolist(), getattr(stored, name).tolist(), name)
+        return packed
+
+    def test_pack_across_month_boundaries(self):
+        masks = bitmaps.pack([
+            (1, datetime.date(2019, 12, 31), True),
+            (1, datetime.date(2020, 1, 1), False),
+            (1, datetime.date(2020, 1, 31), True),
+            (1, datetime.date(2020, 2, 29), True),
+        ])
+        self.assertEqual(masks, {
+            (1, datetime.date(2019, 12, 1)): [1 << 30, 1 << 30],
+            (1, datetime.date(2020, 1, 1)): [1 << 30, 1 << 30 | 1],
+            (1, datetime.date(2020, 2, 1)): [1 << 28, 1 << 28],
+        })
+
+    @override_settings(HOSTEL_ATTENDANCE_BITMAPS=True)
+    def test_full_31_day_month(self):
+        days = [datetime.date(2020, 1, day) for day in range(1, 32)]
+        for date in days:
+            bitmaps.record(date, {self.student.pk: date.day != 31})
+        bitmap = AttendanceBitmap.objects.get(student=self.student)
+        self.assertEqual(bitmap.recorded_mask, 2 ** 31 - 1)
+        self.assertEqual((bitmap.present_days, bitmap.recorded_days), (30, 31))
+        self.assertIs(bitmaps.is_present(self.student.pk, days[-1]), False)
+        self.assertIs(bitmaps.is_present(self.student.pk, datetime.date(2020, 2, 1)), None)
+        bitmaps.forget(days[-1], [self.student.pk])
+        bitmap.refresh_from_db()
+        self.assertEqual(bitmap.recorded_mask, 2 ** 30 - 1)
+
+    def test_streak_at_window_start(self):
+        start = datetime.date(2020, 1, 10)
+        # The absence before the window is not counted
+        self.mark({start + datetime.timedelta(days=offset): offset >= 3 for offset in range(-1, 10)})
+        matrix = self.load(start, start + datetime.timedelta(days=9))
+        self.assertEqual(matrix.longest_absence_streaks().tolist(), [3])
+        self.assertEqual(matrix.longest_presence_streaks().tolist(), [7])
+        self.assertEqual(matrix.current_absence_streaks().tolist(), [0])
+
+    def test_month_without_recorded_days(self):
+        self.mark({
+            datetime.date(2020, 1, 30): False,
+            datetime.date(2020, 1, 31): False,
+            datetime.date(2020, 3, 1): False,
+        })
+        matrix = self.load(datetime.date(2020, 1, 1), datetime.date(2020, 3, 31))
+        self.assertEqual(len(matrix.dates), 91)
+        # An empty February neither breaks nor extends the run
+        self.assertEqual(matrix.current_absence_streaks().tolist(), [3])
+        self.assertEqual(matrix.absence_alerts(3), {self.student.pk: 3})
+        self.assertTrue(math.isnan(matrix.rates(slice(31, 60))[0]))
+        self.assertEqual(matrix.rates().tolist(), [0.0])
+
+    def test_mark_only_writes_bitmaps_when_enabled(self):
+        date = datetime.date(2020, 1, 31)
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_attendance_bulk(date, {self.student.pk: True})
+        self.assertFalse(AttendanceBitmap.objects.exists())
+        with self.settings(HOSTEL_ATTENDANCE_BITMAPS=True), self.captureOnCommitCallbacks(execute=True):
+            mark_attendance_bulk(date, {self.student.pk: False})
+        self.assertIs(bitmaps.is_present(self.student.pk, date), False)
+
+
+@override_settings(HOSTEL_API_TOKENS=['test-token'])
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        Student.objects.create(
+            user=User.objects.create(username='retried'), roll_number='I1', phone_number='0', gender='M',
+        )
+
+    def post(self, present, key='key-1'):
+        return self.client.post('/api/attendance/', json.dumps({'records': [
+            {'roll_number': 'I1', 'date': '2020-03-02', 'present': present},
+        ]}), content_type='application/json', HTTP_AUTHORIZATION='Bearer test-token', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_the_stored_response(self):
+        first = self.post(True)
+        self.assertEqual(first.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', first)
+        recorded_at = Attendance.objects.get().recorded_at
+        retry = self.post(True)
+        self.assertEqual((retry.status_code, retry['Idempotent-Replayed']), (200, 'true'))
+        self.assertEqual(retry.content, first.content)
+        # Not applied a second time
+        self.assertEqual(Attendance.objects.get().recorded_at, recorded_at)
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+    def test_key_reused_for_another_body(self):
+        self.post(True)
+        response = self.post(False)
+        self.assertEqual(response.status_code, 422)
+        self.assertTrue(Attendance.objects.get().is_present)
+        self.assertEqual(self.post(False, key='key-2').status_code, 200)
+        self.assertFalse(Attendance.objects.get().is_present)
+
+    def test_keys_expire(self):
+        self.post(True)
+        self.post(False, key='key-2')
+        IdempotencyKey.objects.filter(key='key-1').update(created_at=timezone.now() - datetime.timedelta(hours=25))
+        response = self.post(True)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertTrue(Attendance.objects.get().is_present)
+        self.assertEqual(IdempotencyKey.objects.count(), 2)
+
+
+class AbsenteeDetectionTests(TestCase):
+    end = datetime.date(2020, 3, 31)
+
+    def test_flags_streaks_and_drops(self):
+        streak, drop, steady, unrecorded = make_students(4)
+        days = [self.end - datetime.timedelta(days=offset) for offset in range(35)]
+        marks = {
+            # Absent for the last three days
+            streak.pk: lambda offset: offset >= 3,
+            # Present for four weeks, then absent on four of the last seven days
+            drop.pk: lambda offset: offset >= 7 or offset % 2 == 1,
+            steady.pk: lambda offset: offset != 10,
+        }
+        Attendance.objects.bulk_create(
+            Attendance(student_id=student_id, date=date, is_present=present(offset))
+            for student_id, present in marks.items()
+            for offset, date in enumerate(days)
+        )
+        flags = {flag.student_id: flag for flag in absentees.detect(end=self.end, streak=3, drop=30.0)}
+        self.assertEqual(set(flags), {streak.pk, drop.pk})
+        self.assertEqual(flags[streak.pk].absence_streak, 3)
+        self.assertEqual(flags[drop.pk].absence_streak, 1)
+        self.assertAlmostEqual(flags[drop.pk].recent_rate, 300 / 7)
+        self.assertEqual(flags[drop.pk].baseline_rate, 100.0)
+        self.assertNotIn(unrecorded.pk, flags)
+
+    def test_run_replaces_the_flags(self):
+        student, = make_students(1)
+        Attendance.objects.create(student=student, date=self.end, is_present=False)
+        self.assertEqual(len(absentees.run(end=self.end, streak=1)), 1)
+        self.assertEqual(absentees.run(end=self.end, streak=2, dry_run=True), [])
+        self.assertEqual(AbsenteeFlag.objects.get().student, student)
+        absentees.run(end=self.end, streak=2)
+        self.assertFalse(AbsenteeFlag.objects.exists())
+
+
+class AnnouncementSearchTests(TestCase):
+    def setUp(self):
+        self.warden = User.objects.create(username='warden', is_staff=True)
+
+    def post(self, *announcements):
+        return Announcement.objects.bulk_create(
+            Announcement(title=title, content=content, posted_by=self.warden) for title, content in announcements
+        )
+
+    def found(self, query):
+        results = search.search_announcements(query)
+        return [announcement.title for announcement in results[0:len(results)]]
+
+    def test_index_follows_bulk_writes(self):
+        self.post(('Water outage', 'No water in Block A on Monday'), ('Mess menu', 'Biryani on Friday'))
+        self.assertEqual(self.found('water'), ['Water outage'])
+        self.assertEqual(self.found('outages'), ['Water outage'])
+        Announcement.objects.filter(title='Mess menu').update(title='Dinner menu', content='Pulao on Friday')
+        self.assertEqual(self.found('biryani'), [])
+        self.assertEqual(self.found('pulao dinner'), ['Dinner menu'])
+        Announcement.objects.filter(title='Water outage').delete()
+        self.assertEqual(self.found('water'), [])
+
+    def test_title_matches_rank_first(self):
+        self.post(('Notice', 'The gym is closed for repairs'), ('Gym closed', 'Repairs this week'))
+        self.assertEqual(self.found('gym repairs'), ['Gym closed', 'Notice'])
+
+    def test_operators_are_taken_as_words(self):
+        self.post(('Fees due', 'Pay the hostel fees'))
+        self.assertEqual(self.found('fees OR NOT "'), [])
+        self.assertEqual(self.found('fees AND'), [])
+        self.assertEqual(self.found('***'), [])
+        self.assertEqual(self.found('FEES due'), ['Fees due'])
+
+    def test_substring_fallback(self):
+        self.post(('Water outage', 'No water in Block A'), ('Mess menu', 'Biryani on Friday'))
+        with mock.patch.object(search, '_vendor', return_value='mysql'):
+            results = search.search_announcements('block wat')
+            self.assertEqual([announcement.title for announcement in results], ['Water outage'])
+            self.assertFalse(search.search_announcements('!!').exists())
+            filtered = search.filter_announcements(Announcement.objects.all(), 'friday')
+            self.assertEqual([announcement.title for announcement in filtered], ['Mess menu'])
+        # The index only matches whole words, unlike the fallback
+        self.assertEqual(self.found('wat'), [])
+
+
+class TypeaheadIndexTests(SimpleTestCase):
+    rows = [
+        {'id': 1, 'roll_number': '21-CS-001', 'phone_number': '0300 1234567',
+         'first_name': 'Ana', 'last_name': 'Khan', 'room_number': '101'},
+        {'id': 2, 'roll_number': '21-EE-002', 'phone_number': '0311-7654321',
+         'first_name': 'Anas', 'last_name': 'Ahmed', 'room_number': None},
+        {'id': 3, 'roll_number': '22-CS-003', 'phone_number': '0300 5550000',
+         'first_name': 'Bilal', 'last_name': 'Anwar', 'room_number': '102'},
+        {'id': 4, 'roll_number': 'AN-004', 'phone_number': '',
+         'first_name': 'Zoë', 'last_name': 'Ånström', 'room_number': None},
+    ]
+
+    def ids(self, query, limit=typeahead.MAX_RESULTS):
+        return [row['id'] for row in typeahead.StudentIndex('v', [dict(row) for row in self.rows]).lookup(query, limit)]
+
+    def test_prefixes_of_each_field(self):
+        self.assertEqual(self.ids('21-cs'), [1])
+        self.assertEqual(self.ids('khan'), [1])
+        self.assertEqual(self.ids('0311765'), [2])
+        self.assertEqual(self.ids('zoë'), [4])
+        self.assertEqual(self.ids('ÅNST'), [4])
+        self.assertEqual(self.ids('x'), [])
+        self.assertEqual(self.ids('   '), [])
+
+    def test_roll_numbers_first_then_names_in_order(self):
+        # AN-004 by roll number, then Ana, Anas and Bilal Anwar by name
+        self.assertEqual(self.ids('an'), [4, 1, 2, 3])
+        self.assertEqual(self.ids('an', limit=2), [4, 1])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.ids('ana 21'), [1, 2])
+        self.assertEqual(self.ids('21 ana'), [1, 2])
+        self.assertEqual(self.ids('ana ahmed'), [2])
+        self.assertEqual(self.ids('ana 22'), [])
+
+    def test_student_matching_twice_is_listed_once(self):
+        self.assertEqual(self.ids('0300'), [1, 3])
+        self.assertEqual(self.ids('a a a a a'), self.ids('a'))
+
+
+class TypeaheadRebuildTests(TestCase):
+    def test_index_follows_roster_writes(self):
+        student = Student.objects.create(
+            user=User.objects.create(username='typed', first_name='Hina'), roll_number='T1', phone_number='0',
+            gender='F',
+        )
+        self.assertEqual([row['id'] for row in typeahead.lookup('hin')], [student.pk])
+        student.user.first_name = 'Sana'
+        student.user.save()
+        self.assertEqual(typeahead.lookup('hin'), [])
+        self.assertEqual([row['first_name'] for row in typeahead.lookup('san')], ['Sana'])
+
+
+class AnnouncementFragmentTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        warden = User.objects.create(username='warden', is_staff=True)
+        Announcement.objects.create(title='Fees due', content='Pay by Friday', posted_by=warden)
+        self.client.force_login(warden)
+
+    def fragment_cached(self, url, name):
+        self.assertContains(self.client.get(url), 'Fees due')
+        etag = stats.get_stats('announcement_etag')['announcement_etag']
+        return cache.get(make_template_fragment_key(name, [etag])) is not None
+
+    def test_fragments_use_the_stats_timeout(self):
+        pages = [('/announcements/', 'announcement_list'), ('/dashboard/', 'admin_dashboard_announcements')]
+        for url, name in pages:
+            with self.subTest(url=url):
+                self.assertTrue(self.fragment_cached(url, name))
+        cache.clear()
+        # A timeout of 0 means "do not cache"; a hard-coded one would still cache
+        with mock.patch.object(stats, 'TIMEOUT', 0):
+            for url, name in pages:
+                with self.subTest(url=url):
+                    self.assertFalse(self.fragment_cached(url, name))
+
+
+@override_settings(HOSTEL_API_TOKENS=['test-token'])
+class VersionStampTests(TestCase):
+    def roster(self, version):
+        return self.client.get(
+            '/api/sync/roster/', {'version': version}, HTTP_AUTHORIZATION='Bearer test-token',
+        ).json()
+
+    def test_stamps_are_shared_between_workers(self):
+        version, rooms = stats.roster_version(), stats.generation(Room, Student)
+        # Another worker with its own per-process cache
+        cache.clear()
+        self.assertEqual((stats.roster_version(), stats.generation(Room, Student)), (version, rooms))
+        self.assertEqual(self.roster(version), {'version': version, 'unchanged': True})
+
+    def test_writes_move_the_stamps(self):
+        version, rooms, students = stats.roster_version(), stats.generation(Room), stats.generation(Student)
+        room = Room.objects.create(room_number='101', room_type='S')
+        self.assertNotEqual(stats.generation(Room), rooms)
+        self.assertEqual(stats.generation(Student), students)
+        self.assertNotEqual(self.roster(version).get('version'), version)
+        version = stats.roster_version()
+        student = Student.objects.create(
+            user=User.objects.create(username='stamped'), roll_number='V1', phone_number='0', gender='M',
+        )
+        assign_room(student, room)
+        self.assertNotEqual(stats.roster_version(), version)
+        self.assertNotEqual(stats.generation(Student), students)
+
+
+@override_settings(HOSTEL_DATABASE_REPLICAS=['replica1'], HOSTEL_REPLICA_STICKY_SECONDS=10)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Which database a request's reads go to; no query is run"""
+    router = routers.ReplicaRouter()
+
+    def read_db(self, request):
+        return HttpResponse(self.router.db_for_read(Room))
+
+    def route(self, method, cookies=None):
+        request = getattr(RequestFactory(), method.lower())('/rooms/')
+        request.COOKIES.update(cookies or {})
+        return ReplicaRoutingMiddleware(self.read_db)(request)
+
+    def test_reads_go_to_a_replica(self):
+        for method in ('GET', 'HEAD'):
+            with self.subTest(method=method):
+                response = self.route(method)
+                self.assertNotIn(routers.STICKY_COOKIE, response.cookies)
+        self.assertEqual(self.route('GET').content, b'replica1')
+        self.assertEqual(self.router.db_for_read(Room), 'default')
+
+    def test_writes_stick_to_the_primary(self):
+        response = self.route('POST')
+        self.assertEqual(response.content, b'default')
+        cookie = response.cookies[routers.STICKY_COOKIE]
+        self.assertEqual((cookie['max-age'], cookie['httponly'], cookie['samesite']), (10, True, 'Lax'))
+        followed = self.route('GET', {routers.STICKY_COOKIE: cookie.value})
+        self.assertEqual(followed.content, b'default')
+        self.assertEqual(self.router.db_for_write(Room), 'default')
+
+    def test_primary_block_inside_a_replica_request(self):
+        def view(request):
+            with routers.primary():
+                inner = self.router.db_for_read(Room)
+            return HttpResponse(f'{inner} {self.router.db_for_read(Room)}')
+        response = ReplicaRoutingMiddleware(view)(RequestFactory().get('/'))
+        self.assertEqual(response.content, b'default replica1')
+
+    def test_async_views_are_routed(self):
+        async def view(request):
+            # Reads made in a worker thread see the request's replica too
+            return HttpResponse(await sync_to_async(self.router.db_for_read)(Room))
+        middleware = ReplicaRoutingMiddleware(view)
+        self.assertEqual(async_to_sync(middleware)(RequestFactory().get('/')).content, b'replica1')
+        response = async_to_sync(middleware)(RequestFactory().post('/'))
+        self.assertEqual(response.content, b'default')
+        self.assertIn(routers.STICKY_COOKIE, response.cookies)
+
+    @override_settings(HOSTEL_DATABASE_REPLICAS=[])
+    def test_unused_without_replicas(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ReplicaRoutingMiddleware(self.read_db)
+
+
+class ManagementCommandTests(SimpleTestCase):
+    def test_help(self):
+        commands = Path(__file__).parent / 'management' / 'commands'
+        for module in pkgutil.iter_modules([str(commands)]):
+            if module.name.startswith('_'):
+                continue
+            with self.subTest(command=module.name):
+                command = load_command_class('hostel', module.name)
+                self.assertIn('usage:', command.create_parser('manage.py', module.name).format_help())
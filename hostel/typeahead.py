@@ -0,0 +1,111 @@
+import bisect
+import re
+import threading
+
+from django.db.models import F
+
+from . import routers, stats
+from .models import Student
+
+MAX_RESULTS = 10
+MAX_TERMS = 4
+
+FIELDS = {
+    'first_name': F('user__first_name'),
+    'last_name': F('user__last_name'),
+    'room_number': F('room__room_number'),
+}
+
+
+def _normalize(text):
+    return text.casefold().strip()
+
+
+class _PrefixList:
+    """Sorted keys with their student ids; the keys sharing a prefix are one run found by bisection"""
+    def __init__(self, entries):
+        # ``entries`` are (key, tie-break, student id); the tie-break orders equal keys
+        entries.sort()
+        self.keys = [entry[0] for entry in entries]
+        self.ids = [entry[-1] for entry in entries]
+
+    def range(self, term):
+        start = bisect.bisect_left(self.keys, term)
+        return self.ids[start:bisect.bisect_left(self.keys, term + '\U0010ffff', start)]
+
+
+class StudentIndex:
+    """In-memory prefix index over the roster for typeahead lookups.
+
+    Roll numbers are kept in one sorted list, and first names, last names
+    and phone digits in another, so ``"ana 21"`` finds Ana whose roll
+    number starts with 21. Roll number matches are listed first in roll
+    number order, then the other matches in name order.
+    """
+    def __init__(self, version, rows):
+        self.version = version
+        self.students = {row['id']: row for row in rows}
+        by_name = sorted(
+            self.students.values(),
+            key=lambda row: (_normalize(row['first_name']), _normalize(row['last_name']), _normalize(row['roll_number'])),
+        )
+        self.rolls = _PrefixList([(_normalize(row['roll_number']), row['id']) for row in by_name])
+        self.names = _PrefixList([
+            (key, position, row['id'])
+            for position, row in enumerate(by_name)
+            for key in (_normalize(row['first_name']), _normalize(row['last_name']), re.sub(r'\D', '', row['phone_number']))
+            if key
+        ])
+
+    @classmethod
+    def build(cls, version):
+        # From the primary, so a lagging replica is not kept under the new version
+        with routers.primary():
+            rows = list(Student.objects.order_by().values('id', 'roll_number', 'phone_number', **FIELDS))
+        return cls(version, rows)
+
+    def _candidates(self, term):
+        """Ids matching ``term``, best first, possibly repeated"""
+        return self.rolls.range(term) + self.names.range(term)
+
+    def lookup(self, query, limit=MAX_RESULTS):
+        terms = [_normalize(term) for term in query.split()[:MAX_TERMS]]
+        terms = [term for term in terms if term]
+        if not terms:
+            return []
+        # Later words only filter the matches of the first, which keep their order
+        others = [set(self._candidates(term)) for term in terms[1:]]
+        results, seen = [], set()
+        for student_id in self._candidates(terms[0]):
+            if student_id not in seen and all(student_id in matches for matches in others):
+                seen.add(student_id)
+                results.append(self.students[student_id])
+                if len(results) == limit:
+                    break
+        return results
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_index():
+    """This process's index, rebuilt when the roster version has moved on.
+
+    The roster version is bumped whenever a student, their user or a room
+    is saved (see signals.py). It is read from the database, so every
+    worker rebuilds on its next lookup after a change.
+    """
+    global _index
+    version = stats.roster_version()
+    index = _index
+    if index is None or index.version != version:
+        with _lock:
+            if _index is None or _index.version != version:
+                _index = StudentIndex.build(version)
+            index = _index
+    return index
+
+
+def lookup(query, limit=MAX_RESULTS):
+    return get_index().lookup(query, limit)
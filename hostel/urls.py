@@ -1,22 +1,35 @@
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from . import views
+from . import api, views
+
+# Read-heavy pages with async versions for ASGI workers
+if settings.HOSTEL_ASYNC_VIEWS:
+    from . import async_views as read_views
+else:
+    read_views = views
 
 urlpatterns = [
     path('', views.home, name='home'),
     path('login/', auth_views.LoginView.as_view(template_name='hostel/login.html'), name='login'),
     path('logout/', auth_views.LogoutView.as_view(next_page='home'), name='logout'),
-    path('dashboard/', views.dashboard, name='dashboard'),
+    path('reset/<uidb64>/<token>/', auth_views.PasswordResetConfirmView.as_view(
+        template_name='hostel/password_reset_confirm.html'), name='password_reset_confirm'),
+    path('reset/done/', auth_views.PasswordResetCompleteView.as_view(
+        template_name='hostel/password_reset_complete.html'), name='password_reset_complete'),
+    path('dashboard/', read_views.dashboard, name='dashboard'),
     path('profile/', views.profile, name='profile'),
+    path('events/', views.event_stream, name='event_stream'),
     
     # Room URLs
-    path('rooms/', views.room_list, name='room_list'),
+    path('rooms/', read_views.room_list, name='room_list'),
     path('rooms/assign/', views.room_assignment, name='room_assignment'),
-    path('rooms/<int:room_id>/', views.room_detail, name='room_detail'),
+    path('rooms/<int:room_id>/', read_views.room_detail, name='room_detail'),
     
     # Announcement URLs
-    path('announcements/', views.announcement_list, name='announcement_list'),
+    path('announcements/', read_views.announcement_list, name='announcement_list'),
     path('announcements/create/', views.announcement_create, name='announcement_create'),
+    path('announcements/feed.json', views.announcement_feed, name='announcement_feed'),
     
     # Attendance URLs
     path('attendance/mark/', views.attendance_mark, name='attendance_mark'),
@@ -25,6 +38,8 @@ urlpatterns = [
     # Admin User Management URLs - changed to avoid conflict with Django admin
     path('manage/users/', views.admin_user_list, name='admin_user_list'),
     path('manage/users/create/', views.admin_create_user, name='admin_create_user'),
+    path('manage/users/import/', views.admin_import_users, name='admin_import_users'),
+    path('manage/users/export/', views.admin_student_export, name='admin_student_export'),
 
     # Admin Room Management URLs
     path('manage/rooms/', views.admin_room_list, name='admin_room_list'),
@@ -33,7 +48,17 @@ urlpatterns = [
 
     # Admin Attendance Management URL
     path('manage/attendance/', views.admin_attendance_list, name='admin_attendance_list'),
+    path('manage/attendance/export/', views.admin_attendance_export, name='admin_attendance_export'),
+    path('manage/attendance/analytics/', views.admin_attendance_analytics, name='admin_attendance_analytics'),
 
     # Admin Announcement Management URL
     path('manage/announcements/', views.admin_announcement_list, name='admin_announcement_list'),
+
+    # JSON API URLs
+    path('api/rooms/', api.rooms, name='api_rooms'),
+    path('api/students/', api.students, name='api_students'),
+    path('api/students/search/', api.student_search, name='api_student_search'),
+    path('api/attendance/', api.attendance, name='api_attendance'),
+    path('api/sync/roster/', api.sync_roster, name='api_sync_roster'),
+    path('api/sync/attendance/', api.sync_attendance, name='api_sync_attendance'),
 ] 
\ No newline at end of file
@@ -1,14 +1,38 @@
+import json
+from datetime import timedelta
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login
+from django.contrib.auth.models import User
 from django.contrib import messages
+from django.core.cache import cache
+from django.db.models import ExpressionWrapper, FloatField, Prefetch, Sum
+from django.db.models.functions import Cast
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.utils import timezone
-from .models import Student, Room, Announcement, Attendance
+from django.views.decorators.http import condition
+from .models import (
+    Student, Room, Announcement, Attendance, AttendanceDailySummary, StudentMonthlyAttendance
+)
 from .forms import (
     UserRegistrationForm, StudentProfileForm, RoomAssignmentForm,
     AnnouncementForm, AttendanceForm, BulkAttendanceForm, AdminCreateUserForm,
-    RoomForm
+    RoomForm, AttendanceFilterForm, StudentImportForm
 )
+from .exports import stream_rows, ATTENDANCE_COLUMNS, STUDENT_COLUMNS
+from .events import CLOSED, get_broadcaster
+from .pagination import keyset_page
+from . import routers, search, stats
+from .services import mark_attendance_bulk, assign_room, RoomUnavailable
+
+ATTENDANCE_PAGE_SIZE = 100
+FEED_SIZE = 20
+# Seconds between SSE keep-alive comments, below common proxy idle timeouts
+SSE_HEARTBEAT = 15
 
 def home(request):
     """Landing page view"""
@@ -43,59 +67,49 @@ def dashboard(request):
     """User dashboard view"""
     # For admin users, show admin dashboard
     if request.user.is_staff:
-        # Get counts for admin dashboard
-        student_count = Student.objects.count()
-        room_count = Room.objects.count()
-        available_rooms = Room.objects.filter(is_available=True).count()
-        announcement_count = Announcement.objects.count()
-        
-        # Get latest announcements
-        announcements = Announcement.objects.all()[:5]
-        
-        # Get recent attendance records
-        recent_attendance = Attendance.objects.order_by('-date')[:10]
-        
-        return render(request, 'hostel/admin_dashboard.html', {
-            'student_count': student_count,
-            'room_count': room_count,
-            'available_rooms': available_rooms,
-            'announcement_count': announcement_count,
-            'announcements': announcements,
-            'recent_attendance': recent_attendance
-        })
+        # Counts, latest announcements and recent attendance come from the stats cache
+        return render(request, 'hostel/admin_dashboard.html', {**stats.get_stats(), 'fragment_timeout': stats.TIMEOUT})
     
     # For regular users, show student dashboard
-    try:
-        student = request.user.student
-        room = student.room
-        attendance = Attendance.objects.filter(student=student).order_by('-date')[:5]
-    except Student.DoesNotExist:
-        student = None
-        room = None
-        attendance = None
+    student = request.student
+    if not student:
         messages.warning(request, 'Please complete your student profile.')
         return redirect('profile')
+    room = student.room
+    attendance = Attendance.objects.filter(student=student).order_by('-date')[:5]
+    month_attendance = StudentMonthlyAttendance.objects.filter(
+        student=student, month=timezone.localdate().replace(day=1)
+    ).first()
     
-    announcements = Announcement.objects.all()[:5]
+    announcements = stats.get_stats('announcements', 'announcement_etag')
     
     return render(request, 'hostel/dashboard.html', {
         'student': student,
         'room': room,
         'attendance': attendance,
-        'announcements': announcements
+        'month_attendance': month_attendance,
+        'announcements': announcements['announcements'],
+        'announcement_etag': announcements['announcement_etag'],
+        'fragment_timeout': stats.TIMEOUT,
     })
 
 @login_required
 def room_list(request):
     """View all rooms"""
-    rooms = Room.objects.all()
-    return render(request, 'hostel/room_list.html', {'rooms': rooms})
+    # The rendered table is cached in the template until a room changes; the
+    # queryset only runs on a miss, on the primary so a lagging replica isn't cached
+    rooms = routers.from_primary(Room.objects.all())
+    return render(request, 'hostel/room_list.html', {
+        'rooms': rooms,
+        'rooms_version': stats.generation(Room),
+        'fragment_timeout': stats.TIMEOUT,
+    })
 
 @login_required
 def room_detail(request, room_id):
     """View room details"""
     room = get_object_or_404(Room, id=room_id)
-    students = Student.objects.filter(room=room)
+    students = Student.objects.filter(room=room).select_related('user')
     return render(request, 'hostel/room_detail.html', {
         'room': room,
         'students': students
@@ -110,41 +124,114 @@ def room_assignment(request):
         return redirect('admin:hostel_student_changelist')
         
     # For regular users
-    try:
-        student = Student.objects.get(user=request.user)
-        
-        if request.method == 'POST':
-            form = RoomAssignmentForm(request.POST, instance=student)
-            if form.is_valid():
-                # Update old room availability if exists
-                if student.room:
-                    old_room = student.room
-                    old_room.is_available = True
-                    old_room.save()
-                
-                # Save new room assignment
-                new_student = form.save(commit=False)
-                new_room = new_student.room
-                if new_room:
-                    new_room.is_available = False
-                    new_room.save()
-                new_student.save()
-                
-                messages.success(request, 'Room assigned successfully!')
-                return redirect('dashboard')
-        else:
-            form = RoomAssignmentForm(instance=student)
-        
-        return render(request, 'hostel/room_assignment.html', {'form': form})
-    except Student.DoesNotExist:
+    student = request.student
+    if not student:
         messages.warning(request, 'Please complete your student profile first.')
         return redirect('profile')
+    
+    if request.method == 'POST':
+        form = RoomAssignmentForm(request.POST, instance=student)
+        if form.is_valid():
+            try:
+                assign_room(student, form.cleaned_data['room'])
+            except RoomUnavailable as e:
+                form.add_error('room', str(e))
+            else:
+                messages.success(request, 'Room assigned successfully!')
+                return redirect('dashboard')
+    else:
+        form = RoomAssignmentForm(instance=student)
+    
+    return render(request, 'hostel/room_assignment.html', {'form': form})
+
+def _announcement_etag(request, *args, **kwargs):
+    # Pages also show the user's name and staff-only links, so the tag is per user
+    return f"{request.user.pk}-{stats.get_stats('announcement_etag')['announcement_etag']}"
+
+def _announcement_modified(request, *args, **kwargs):
+    return stats.get_stats('announcement_modified')['announcement_modified']
 
 @login_required
+@condition(etag_func=_announcement_etag, last_modified_func=_announcement_modified)
 def announcement_list(request):
-    """View all announcements"""
-    announcements = Announcement.objects.all()
-    return render(request, 'hostel/announcement_list.html', {'announcements': announcements})
+    """View all announcements, or ranked search results for ``?q=``"""
+    query = request.GET.get('q', '').strip()
+    # The rendered list is cached in the template; the queryset only runs on a miss,
+    # on the primary so a lagging replica isn't cached under the new stamp
+    announcements = routers.from_primary(Announcement.objects.select_related('posted_by'))
+    return render(request, 'hostel/announcement_list.html', {
+        'announcements': announcements,
+        'announcement_etag': stats.get_stats('announcement_etag')['announcement_etag'],
+        'fragment_timeout': stats.TIMEOUT,
+        'query': query,
+        'results': search.search_page(query, request.GET.get('page')) if query else None,
+    })
+
+def _feed_etag(request):
+    return stats.get_stats('announcement_etag')['announcement_etag']
+
+@login_required
+@condition(etag_func=_feed_etag, last_modified_func=_announcement_modified)
+def announcement_feed(request):
+    """JSON Feed of the latest announcements; pollers get a 304 from the cached stamp alone"""
+    etag = _feed_etag(request)
+    body = cache.get_or_set(f'hostel:announcement_feed:{request.get_host()}:{etag}', lambda: _render_feed(request), stats.TIMEOUT)
+    return HttpResponse(body, content_type='application/feed+json')
+
+def _render_feed(request):
+    items = [
+        {
+            'id': str(announcement.pk),
+            'url': request.build_absolute_uri(reverse('announcement_list')) + f'#announcement-{announcement.pk}',
+            'title': announcement.title,
+            'content_text': announcement.content,
+            'date_published': announcement.date_posted.isoformat(),
+            'date_modified': announcement.updated_at.isoformat(),
+            'authors': [{'name': announcement.posted_by.get_full_name() or announcement.posted_by.username}],
+        }
+        for announcement in Announcement.objects.select_related('posted_by')[:FEED_SIZE]
+    ]
+    return json.dumps({
+        'version': 'https://jsonfeed.org/version/1.1',
+        'title': 'Hostel Announcements',
+        'home_page_url': request.build_absolute_uri(reverse('announcement_list')),
+        'feed_url': request.build_absolute_uri(reverse('announcement_feed')),
+        'items': items,
+    })
+
+@login_required
+async def event_stream(request):
+    """Server-Sent Events stream of new announcements and room occupancy changes"""
+    # Under WSGI every open stream would pin a worker thread
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse('Live updates need the ASGI server.', status=501, content_type='text/plain')
+    try:
+        last_event_id = int(request.headers['Last-Event-ID'])
+    except (KeyError, ValueError):
+        last_event_id = None
+    
+    response = StreamingHttpResponse(_sse_messages(last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+async def _sse_messages(last_event_id):
+    subscription = get_broadcaster().subscribe(last_event_id)
+    try:
+        yield 'retry: 5000\n\n'
+        for message in subscription.backlog:
+            yield _sse_format(message)
+        while True:
+            message = await subscription.get(SSE_HEARTBEAT)
+            if message is CLOSED:
+                break
+            yield _sse_format(message) if message else ': keep-alive\n\n'
+    finally:
+        subscription.close()
+
+def _sse_format(message):
+    event_id, event, data = message
+    return f'id: {event_id}\nevent: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'
 
 @login_required
 def announcement_create(request):
@@ -192,22 +279,26 @@ def attendance_bulk(request):
         return redirect('dashboard')
     
     # Get all students - moved outside the if/else block to ensure it's always defined
-    students = Student.objects.all()
+    students = Student.objects.all().select_related('user', 'room')
         
     if request.method == 'POST':
         form = BulkAttendanceForm(request.POST)
         if form.is_valid():
             date = form.cleaned_data['date']
             
-            for student in students:
-                student_present = request.POST.get(f'student_{student.id}') == 'on'
-                attendance, created = Attendance.objects.update_or_create(
-                    student=student,
-                    date=date,
-                    defaults={'is_present': student_present}
-                )
+            student_ids = Student.objects.values_list('id', flat=True)
+            if 'present_ids' in request.POST:
+                # static/js/bulk-attendance.js packs the ticked boxes into one
+                # field, since a field per student would exceed DATA_UPLOAD_MAX_NUMBER_FIELDS
+                present = set(request.POST['present_ids'].split(','))
+                presence = {student_id: str(student_id) in present for student_id in student_ids}
+            else:
+                presence = {
+                    student_id: request.POST.get(f'student_{student_id}') == 'on' for student_id in student_ids
+                }
+            created, updated = mark_attendance_bulk(date, presence)
             
-            messages.success(request, 'Bulk attendance marked successfully!')
+            messages.success(request, f'Bulk attendance marked successfully! ({created} new, {updated} updated)')
             return redirect('dashboard')
     else:
         form = BulkAttendanceForm()
@@ -226,9 +317,8 @@ def profile(request):
         return redirect('admin:index')
         
     # For regular users, show/edit student profile
-    try:
-        student = get_object_or_404(Student, user=request.user)
-        
+    student = request.student
+    if student:
         if request.method == 'POST':
             form = StudentProfileForm(request.POST, instance=student)
             if form.is_valid():
@@ -239,20 +329,20 @@ def profile(request):
             form = StudentProfileForm(instance=student)
         
         return render(request, 'hostel/profile.html', {'form': form})
-    except Exception as e:
-        # Create a new student profile if it doesn't exist
-        if request.method == 'POST':
-            form = StudentProfileForm(request.POST)
-            if form.is_valid():
-                student = form.save(commit=False)
-                student.user = request.user
-                student.save()
-                messages.success(request, 'Profile created successfully!')
-                return redirect('dashboard')
-        else:
-            form = StudentProfileForm()
-        
-        return render(request, 'hostel/profile.html', {'form': form, 'new_profile': True})
+    
+    # Create a new student profile if it doesn't exist
+    if request.method == 'POST':
+        form = StudentProfileForm(request.POST)
+        if form.is_valid():
+            student = form.save(commit=False)
+            student.user = request.user
+            student.save()
+            messages.success(request, 'Profile created successfully!')
+            return redirect('dashboard')
+    else:
+        form = StudentProfileForm()
+    
+    return render(request, 'hostel/profile.html', {'form': form, 'new_profile': True})
 
 @login_required
 def admin_create_user(request):
@@ -264,14 +354,49 @@ def admin_create_user(request):
     if request.method == 'POST':
         form = AdminCreateUserForm(request.POST)
         if form.is_valid():
-            student = form.save()
-            messages.success(request, f'Student {student.user.username} created successfully!')
-            return redirect('admin_user_list')
+            try:
+                student = form.save()
+            except RoomUnavailable as e:
+                form.add_error('room', str(e))
+            else:
+                messages.success(request, f'Student {student.user.username} created successfully!')
+                return redirect('admin_user_list')
     else:
         form = AdminCreateUserForm()
     
     return render(request, 'hostel/admin_create_user.html', {'form': form})
 
+@login_required
+def admin_import_users(request):
+    """Admin view to onboard students in bulk from a CSV or XLSX file"""
+    if not request.user.is_staff:
+        messages.error(request, 'Only administrators can import users.')
+        return redirect('dashboard')
+    
+    result = None
+    if request.method == 'POST':
+        # Imported here: the importer pulls in csv and a process pool that no
+        # other view needs, which every cold start would otherwise pay for
+        from .importer import read_rows, import_students
+
+        form = StudentImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                rows = read_rows(upload, upload.name)
+            except ValueError as e:
+                form.add_error('file', str(e))
+            else:
+                result = import_students(rows, skip_invalid=form.cleaned_data['skip_invalid'])
+                if result.created:
+                    messages.success(request, f'{len(result.created)} students imported successfully!')
+                if result.errors:
+                    messages.warning(request, f'{len(result.errors)} rows have errors.')
+    else:
+        form = StudentImportForm()
+    
+    return render(request, 'hostel/admin_import_users.html', {'form': form, 'result': result})
+
 @login_required
 def admin_user_list(request):
     """Admin view to list all users"""
@@ -279,9 +404,14 @@ def admin_user_list(request):
         messages.error(request, 'Only administrators can view user list.')
         return redirect('dashboard')
         
-    students = Student.objects.all().select_related('user', 'room')
+    # Cached in the template like room_list
+    students = routers.from_primary(Student.objects.all().select_related('user', 'room'))
     
-    return render(request, 'hostel/admin_user_list.html', {'students': students})
+    return render(request, 'hostel/admin_user_list.html', {
+        'students': students,
+        'students_version': stats.generation(Student, User, Room),
+        'fragment_timeout': stats.TIMEOUT,
+    })
 
 @login_required
 def admin_room_list(request):
@@ -290,9 +420,16 @@ def admin_room_list(request):
         messages.error(request, 'Only administrators can view room list.')
         return redirect('dashboard')
         
-    rooms = Room.objects.all()
+    # Cached in the template like room_list
+    rooms = routers.from_primary(Room.objects.prefetch_related(
+        Prefetch('student_set', queryset=Student.objects.select_related('user'))
+    ))
     
-    return render(request, 'hostel/admin_room_list.html', {'rooms': rooms})
+    return render(request, 'hostel/admin_room_list.html', {
+        'rooms': rooms,
+        'rooms_version': stats.generation(Room, Student, User),
+        'fragment_timeout': stats.TIMEOUT,
+    })
 
 @login_required
 def admin_room_create(request, room_id=None):
@@ -331,9 +468,95 @@ def admin_attendance_list(request):
         messages.error(request, 'Only administrators can view attendance records.')
         return redirect('dashboard')
         
-    attendance_records = Attendance.objects.all().select_related('student', 'student__user', 'student__room').order_by('-date')
+    filter_form = AttendanceFilterForm(request.GET)
+    attendance_records = filter_form.filter(
+        Attendance.objects.select_related('student', 'student__user', 'student__room')
+    )
+    attendance_records, next_cursor, prev_cursor = keyset_page(
+        attendance_records,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        page_size=ATTENDANCE_PAGE_SIZE,
+    )
+    
+    # Keep the active filters on the pagination links
+    filter_query = request.GET.copy()
+    filter_query.pop('after', None)
+    filter_query.pop('before', None)
+    
+    return render(request, 'hostel/admin_attendance_list.html', {
+        'attendance_records': attendance_records,
+        'filter_form': filter_form,
+        'filter_query': filter_query.urlencode(),
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor,
+    })
+
+def _attendance_totals(present='present', total='total'):
+    return {
+        'attended': Sum(present),
+        'recorded': Sum(total),
+        'rate': ExpressionWrapper(Cast(Sum(present), FloatField()) * 100 / Sum(total), output_field=FloatField()),
+    }
+
+@login_required
+def admin_attendance_analytics(request):
+    """Admin view of attendance percentages, read from the rollup tables only"""
+    if not request.user.is_staff:
+        messages.error(request, 'Only administrators can view attendance analytics.')
+        return redirect('dashboard')
+    
+    try:
+        days = min(max(int(request.GET.get('days', 90)), 1), 730)
+    except ValueError:
+        days = 90
+    since = timezone.localdate() - timedelta(days=days - 1)
+    
+    summaries = AttendanceDailySummary.objects.filter(date__gte=since)
+    by_block = (summaries.values('room__block').annotate(**_attendance_totals())
+                .order_by('room__block'))
+    by_day = (summaries.values('date').annotate(**_attendance_totals())
+              .order_by('-date'))
+    lowest_rooms = (summaries.filter(room__isnull=False)
+                    .values('room__room_number', 'room__block')
+                    .annotate(**_attendance_totals())
+                    .order_by('rate', 'room__room_number')[:20])
+    lowest_students = (StudentMonthlyAttendance.objects.filter(month__gte=since.replace(day=1))
+                       .values('student__roll_number', 'student__user__first_name', 'student__user__last_name')
+                       .annotate(**_attendance_totals('present_days', 'recorded_days'))
+                       .order_by('rate', 'student__roll_number')[:20])
+    
+    return render(request, 'hostel/admin_attendance_analytics.html', {
+        'days': days,
+        'since': since,
+        'by_block': by_block,
+        'by_day': by_day,
+        'lowest_rooms': lowest_rooms,
+        'lowest_students': lowest_students,
+    })
+
+@login_required
+def admin_attendance_export(request):
+    """Admin view to stream attendance records as CSV or NDJSON"""
+    if not request.user.is_staff:
+        messages.error(request, 'Only administrators can export attendance records.')
+        return redirect('dashboard')
+    
+    filter_form = AttendanceFilterForm(request.GET)
+    records = filter_form.filter(Attendance.objects.all()).order_by('date', 'id')
+    
+    return stream_rows(records, ATTENDANCE_COLUMNS, request.GET.get('format'), 'attendance')
+
+@login_required
+def admin_student_export(request):
+    """Admin view to stream the student roster with rooms as CSV or NDJSON"""
+    if not request.user.is_staff:
+        messages.error(request, 'Only administrators can export the student roster.')
+        return redirect('dashboard')
+    
+    students = Student.objects.order_by('roll_number')
     
-    return render(request, 'hostel/admin_attendance_list.html', {'attendance_records': attendance_records})
+    return stream_rows(students, STUDENT_COLUMNS, request.GET.get('format'), 'students')
 
 @login_required
 def admin_announcement_list(request):
@@ -0,0 +1,10 @@
+"""
+URLs of the Django admin, imported the first time an admin URL is resolved
+or reversed. With HOSTEL_LEAN_STARTUP the admin modules of the installed
+apps are only discovered here.
+"""
+from django.contrib import admin
+
+admin.autodiscover()
+
+urlpatterns = admin.site.get_urls()
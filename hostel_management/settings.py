@@ -22,11 +22,16 @@ DEBUG = os.environ.get('DJANGO_DEBUG', 'True').lower() in ('1', 'true', 'yes')
 
 ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', '*').split(',') if os.environ.get('ALLOWED_HOSTS') else ['*']
 
+# Lean startup for serverless cold starts, on by default on Vercel: the admin
+# is only registered when /admin/ is first used, and static files are left to
+# the platform (vercel.json routes /static/) instead of WhiteNoise.
+HOSTEL_LEAN_STARTUP = os.environ.get('HOSTEL_LEAN_STARTUP', os.environ.get('VERCEL', 'False')).lower() in ('1', 'true', 'yes')
+
 
 # Application definition
 
 INSTALLED_APPS = [
-    'django.contrib.admin',
+    'django.contrib.admin.apps.SimpleAdminConfig' if HOSTEL_LEAN_STARTUP else 'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -37,15 +42,20 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'hostel.middleware.QueryInstrumentationMiddleware',
+    'hostel.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'hostel.middleware.StudentMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
+if HOSTEL_LEAN_STARTUP:
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
 
 ROOT_URLCONF = 'hostel_management.urls'
 
@@ -53,8 +63,15 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Templates are compiled once per process and kept; the
+            # autoreloader empties the cache when a template changes in DEBUG
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -71,15 +88,34 @@ WSGI_APPLICATION = 'hostel_management.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 # Vercel: set DATABASE_URL (PostgreSQL). Local Oracle: set DB_ENGINE=oracle. Else: SQLite.
+#
+# With DB_POOL=true, PostgreSQL (psycopg 3) and Oracle (python-oracledb) hand
+# out connections from a pool per worker process, sized by DB_POOL_MIN_SIZE and
+# DB_POOL_MAX_SIZE; keep max size times worker count under the server's limit.
+# Without a pool each thread keeps its connection for DB_CONN_MAX_AGE seconds.
+
+DB_POOL = os.environ.get('DB_POOL', 'False').lower() in ('1', 'true', 'yes')
+DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', 2))
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 10))
+# Seconds a request waits for a free pooled connection before failing
+DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+# Pools replace persistent connections; Django refuses both at once
+DB_CONN_MAX_AGE = 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', 600))
 
 if os.environ.get('DATABASE_URL'):
     import dj_database_url
     DATABASES = {
         'default': dj_database_url.config(
-            conn_max_age=600,
+            conn_max_age=DB_CONN_MAX_AGE,
             conn_health_checks=True,
         )
     }
+    if DB_POOL and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+        DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+            'min_size': DB_POOL_MIN_SIZE,
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': DB_POOL_TIMEOUT,
+        }
 elif os.environ.get('DB_ENGINE') == 'oracle':
     DATABASES = {
         'default': {
@@ -87,6 +123,12 @@ elif os.environ.get('DB_ENGINE') == 'oracle':
             'NAME': os.environ.get('ORACLE_NAME', '127.0.0.1:1521/xepdb1'),
             'USER': os.environ.get('ORACLE_USER', 'HOSTEL'),
             'PASSWORD': os.environ.get('ORACLE_PASSWORD', 'hostel123'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # python-oracledb session pool
+                'pool': {'min': DB_POOL_MIN_SIZE, 'max': DB_POOL_MAX_SIZE, 'increment': 1},
+            } if DB_POOL else {},
         }
     }
 else:
@@ -94,10 +136,133 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # Take the write lock when a transaction starts so concurrent
+                # writers wait on the busy timeout instead of failing to
+                # upgrade a read lock with "database is locked".
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+                # Run on every new connection. WAL lets readers work while a
+                # writer commits; synchronous=NORMAL is durable with WAL except
+                # on power loss; reads go through a 128 MB memory map.
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA mmap_size=134217728;'
+                    'PRAGMA temp_store=MEMORY;'
+                    'PRAGMA cache_size=-16000;'
+                ),
+            },
         }
     }
 
+# Read replicas: comma-separated database URLs in DATABASE_REPLICA_URLS become
+# the aliases replica1, replica2, ... GET and HEAD requests read from one of
+# them (hostel.routers, hostel.middleware.ReplicaRoutingMiddleware); writes,
+# management commands and a browser's requests for HOSTEL_REPLICA_STICKY_SECONDS
+# after it wrote use the primary. Locally, sqlite:///replica.sqlite3 stands in
+# for a replica; refresh it from the primary with `manage.py sync_replica`.
 
+HOSTEL_DATABASE_REPLICAS = []
+for number, url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')), 1):
+    import dj_database_url
+    replica = dj_database_url.parse(url.strip(), conn_max_age=DB_CONN_MAX_AGE, conn_health_checks=True)
+    # Tests read replicas from the test primary
+    replica['TEST'] = {'MIRROR': 'default'}
+    if replica['ENGINE'] == 'django.db.backends.sqlite3':
+        # Writes belong on the primary; fail loudly if one slips through
+        replica['OPTIONS'] = {'init_command': 'PRAGMA query_only=ON;PRAGMA mmap_size=134217728;'}
+    elif DB_POOL and replica['ENGINE'] == 'django.db.backends.postgresql':
+        replica['OPTIONS'] = {
+            'pool': {'min_size': DB_POOL_MIN_SIZE, 'max_size': DB_POOL_MAX_SIZE, 'timeout': DB_POOL_TIMEOUT},
+        }
+    DATABASES[f'replica{number}'] = replica
+    HOSTEL_DATABASE_REPLICAS.append(f'replica{number}')
+
+if HOSTEL_DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ['hostel.routers.ReplicaRouter']
+HOSTEL_REPLICA_STICKY_SECONDS = int(os.environ.get('HOSTEL_REPLICA_STICKY_SECONDS', 10))
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Per-process memory by default. Multi-worker deployments should point
+# CACHE_BACKEND/CACHE_LOCATION at a shared cache (e.g. Redis) so signal-driven
+# invalidation reaches every worker.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'hostel'),
+    }
+}
+# Sessions (see SESSION_ENGINE) get their own alias so they can be kept in a
+# different store, e.g. Redis that survives restarts, than the stats. A
+# per-process cache also gets its own location, so stats and fragment churn
+# cannot evict sessions.
+_session_cache_backend = os.environ.get('SESSION_CACHE_BACKEND', CACHES['default']['BACKEND'])
+_shared_sessions = not _session_cache_backend.endswith(('LocMemCache', 'DummyCache'))
+CACHES['sessions'] = {
+    'BACKEND': _session_cache_backend,
+    'LOCATION': os.environ.get(
+        'SESSION_CACHE_LOCATION', CACHES['default']['LOCATION'] if _shared_sessions else 'hostel-sessions',
+    ),
+    'KEY_PREFIX': 'sessions',
+}
+
+# With a shared sessions cache, sessions are read from it and written
+# through to the database, so a warm request skips the django_session query.
+# A per-process cache would keep serving a session after a logout handled
+# by another worker flushed it, so then sessions stay in the database. Set
+# SESSION_ENGINE=django.contrib.sessions.backends.signed_cookies to keep them
+# in the cookie instead (no server-side storage, but logout cannot revoke a
+# copied cookie).
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', (
+    'django.contrib.sessions.backends.cached_db' if _shared_sessions
+    else 'django.contrib.sessions.backends.db'
+))
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Seconds the dashboard stats stay cached before being recomputed regardless of signals
+HOSTEL_STATS_TIMEOUT = int(os.environ.get('HOSTEL_STATS_TIMEOUT', 300))
+
+# Also keep attendance as one AttendanceBitmap row per student per month.
+# Streaks and absentee detection then read ~30x fewer rows, at the cost of a
+# second write per roll call. Run rebuild_attendance_summaries after turning it on.
+HOSTEL_ATTENDANCE_BITMAPS = os.environ.get('HOSTEL_ATTENDANCE_BITMAPS', 'False').lower() in ('1', 'true', 'yes')
+
+# Route the dashboard, room and announcement pages to hostel.async_views.
+# hostel_management/asgi.py turns this on; under WSGI the sync views are faster.
+HOSTEL_ASYNC_VIEWS = os.environ.get('HOSTEL_ASYNC_VIEWS', 'False').lower() in ('1', 'true', 'yes')
+
+
+# JSON API (hostel.api). Devices authenticate with "Authorization: Bearer <token>"
+# using one of these comma-separated tokens; staff sessions work as well.
+HOSTEL_API_TOKENS = [token for token in os.environ.get('HOSTEL_API_TOKENS', '').split(',') if token]
+HOSTEL_API_MAX_RECORDS = 10000
+# Hours an Idempotency-Key is remembered
+HOSTEL_API_IDEMPOTENCY_TTL = 24
+
+
+# Request instrumentation (hostel.middleware.QueryInstrumentationMiddleware)
+# Adds a Server-Timing header and a JSON log line with query counts, DB time
+# and repeated (N+1) queries for a sample of requests.
+
+HOSTEL_INSTRUMENTATION = os.environ.get('HOSTEL_INSTRUMENTATION', 'False').lower() in ('1', 'true', 'yes')
+HOSTEL_INSTRUMENTATION_SAMPLE_RATE = float(os.environ.get('HOSTEL_INSTRUMENTATION_SAMPLE_RATE', '1.0' if DEBUG else '0.1'))
+HOSTEL_INSTRUMENTATION_DUPLICATE_THRESHOLD = 3
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'hostel': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
 
 
 # Password validation
@@ -14,10 +14,24 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
 from django.urls import path, include
+from django.urls.resolvers import RoutePattern, URLResolver
+
+
+class LazyURLResolver(URLResolver):
+    """A namespaced include whose URLconf is imported when a URL under it is resolved or reversed.
+
+    A plain include is imported when the URLconf loads, and the parent's
+    reverse() setup would import a lazy one anyway; its names are only
+    reachable through the namespace, so that setup can skip it.
+    """
+    def _populate(self):
+        if 'urlconf_module' in self.__dict__:
+            super()._populate()
+
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
+    # Keeps the admin, and with HOSTEL_LEAN_STARTUP its registrations, out of cold starts
+    LazyURLResolver(RoutePattern('admin/'), 'hostel_management.admin_urls', app_name='admin', namespace='admin'),
     path('', include('hostel.urls')),
 ]
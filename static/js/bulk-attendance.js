@@ -0,0 +1,36 @@
+// Posts the ticked "Present" boxes of the bulk attendance form as one
+// comma-separated present_ids field. A field per student would trip
+// DATA_UPLOAD_MAX_NUMBER_FIELDS (1000) once the roster is that large;
+// without JavaScript the boxes are posted one by one as before.
+(function () {
+    var form = document.querySelector('[data-bulk-attendance]');
+    if (!form) {
+        return;
+    }
+    var packed = document.createElement('input');
+    packed.type = 'hidden';
+    packed.name = 'present_ids';
+
+    form.addEventListener('submit', function () {
+        var ids = [];
+        form.querySelectorAll('input[data-student]').forEach(function (box) {
+            if (box.checked) {
+                ids.push(box.dataset.student);
+            }
+            // Disabled inputs are left out of the submission
+            box.disabled = true;
+        });
+        packed.value = ids.join(',');
+        form.appendChild(packed);
+    });
+
+    // Coming back to the page from the history cache
+    window.addEventListener('pageshow', function () {
+        form.querySelectorAll('input[data-student]').forEach(function (box) {
+            box.disabled = false;
+        });
+        if (packed.parentNode) {
+            packed.parentNode.removeChild(packed);
+        }
+    });
+})();
@@ -0,0 +1,49 @@
+// Subscribes to the Server-Sent Events stream and updates the page in place.
+// Elements opt in with data attributes:
+//   data-live-alerts            container for new announcement notices
+//   data-available-rooms        free room counter
+//   data-room-occupancy="<id>"  "occupants/capacity" cell of a room
+//   data-room-status="<id>"     Available/Full badge of a room
+(function () {
+    var script = document.currentScript;
+    if (!window.EventSource || !script) {
+        return;
+    }
+    var source = new EventSource(script.dataset.eventsUrl);
+
+    source.addEventListener('announcement', function (event) {
+        var announcement = JSON.parse(event.data);
+        var container = document.querySelector('[data-live-alerts]');
+        if (!container) {
+            return;
+        }
+        var alert = document.createElement('div');
+        alert.className = 'alert alert-info alert-dismissible fade show';
+        alert.setAttribute('role', 'alert');
+        var title = document.createElement('strong');
+        title.textContent = 'New announcement: ' + announcement.title;
+        var close = document.createElement('button');
+        close.type = 'button';
+        close.className = 'btn-close';
+        close.setAttribute('data-bs-dismiss', 'alert');
+        alert.appendChild(title);
+        alert.appendChild(close);
+        container.prepend(alert);
+    });
+
+    source.addEventListener('occupancy', function (event) {
+        var update = JSON.parse(event.data);
+        document.querySelectorAll('[data-available-rooms]').forEach(function (element) {
+            element.textContent = update.available_rooms;
+        });
+        update.rooms.forEach(function (room) {
+            document.querySelectorAll('[data-room-occupancy="' + room.id + '"]').forEach(function (element) {
+                element.textContent = room.occupant_count + '/' + room.capacity;
+            });
+            document.querySelectorAll('[data-room-status="' + room.id + '"]').forEach(function (element) {
+                element.className = 'badge ' + (room.is_available ? 'bg-success' : 'bg-danger');
+                element.textContent = room.is_available ? 'Available' : 'Full';
+            });
+        });
+    });
+})();